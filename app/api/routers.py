@@ -2,6 +2,8 @@
 from fastapi import APIRouter
 from app.api.v1.endpoints import prediction
 from app.api.v1.endpoints import trigger
+from app.api.v1.endpoints import metrics
+from app.api.v1.endpoints import verdicts
 
 router = APIRouter()
 
@@ -17,3 +19,9 @@ router.include_router(prediction.router, tags=["prediction"])
 # trigger router has @router.post("/simulate")
 # We want /api/v1/trigger/simulate
 router.include_router(trigger.router, prefix="/trigger", tags=["hardware-trigger"])
+
+# Runtime metrics (load control, gating, multi-shot) -> /api/v1/metrics
+router.include_router(metrics.router, tags=["metrics"])
+
+# Local verdict log aggregates -> /api/v1/verdicts/summary, /api/v1/verdicts/series
+router.include_router(verdicts.router, prefix="/verdicts", tags=["verdicts"])
@@ -0,0 +1,29 @@
+
+from fastapi import APIRouter
+from app.services.load_controller import get_load_controller
+from app.services.scheduler import get_scheduler
+from app.services.hardware_trigger import get_trigger_listener
+from app.services.inference_service import get_inference_service
+from app.services.verdict_store import get_verdict_store
+
+router = APIRouter()
+
+@router.get("/metrics")
+async def get_metrics():
+    """
+    Runtime metrics of the inference pipeline (scheduler counts are per priority class).
+    Sections of disabled features are null.
+    """
+    listener = get_trigger_listener()
+    service = get_inference_service()
+    verdict_store = get_verdict_store()
+    return {
+        "scheduler": get_scheduler().stats(),
+        "load_control": get_load_controller().stats(),
+        "presence": listener.presence_detector.stats() if listener.presence_detector else None,
+        "multishot": listener.multishot.stats() if listener.multishot else None,
+        "cascade": service.cascade_stats() if service.cascade_models else None,
+        "station": listener.station.stats() if listener.station else None,
+        "no_verdict": dict(listener.no_verdicts),
+        "verdict_store": verdict_store.stats() if verdict_store else None,
+    }
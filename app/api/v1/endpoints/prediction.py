@@ -1,11 +1,16 @@
 
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, BackgroundTasks
+from fastapi import APIRouter, UploadFile, File, Header, HTTPException, Depends, BackgroundTasks
+from typing import Optional
+from app.core.config import settings
 from app.schemas.prediction import PredictionResult, ErrorResponse
 from app.services.inference_service import get_inference_service, ModelInference
+from app.services.scheduler import Priority, RequestShed, get_scheduler
+from app.services.verdict_store import get_verdict_store
 from app.utils.image_processing import preprocess_image
 from app.services.notifier import notifier_service
 from app.utils.s3_client import s3_client
 import logging
+import time
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -27,12 +32,26 @@ async def handle_notification(result: PredictionResult, image_bytes: bytes):
     except Exception as e:
         logger.error(f"Background notification failed: {e}")
 
-@router.post("/predict", response_model=PredictionResult, responses={500: {"model": ErrorResponse}})
+@router.post(
+    "/predict",
+    response_model=PredictionResult,
+    responses={
+        429: {"model": ErrorResponse},
+        500: {"model": ErrorResponse},
+        503: {"model": ErrorResponse},
+    },
+)
 async def predict_image(
     background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
-    service: ModelInference = Depends(get_inference_service)
+    service: ModelInference = Depends(get_inference_service),
+    x_deadline_ms: Optional[int] = Header(None, description="Time budget for the verdict in milliseconds"),
 ):
+    # Deadline counts from arrival, upload time is part of the budget
+    arrival = time.monotonic()
+    deadline_ms = x_deadline_ms if x_deadline_ms is not None else settings.API_DEADLINE_MS
+    deadline = arrival + deadline_ms / 1000 if deadline_ms is not None else None
+
     try:
         if not file.content_type.startswith("image/"):
             raise HTTPException(status_code=400, detail="File must be an image")
@@ -44,7 +63,15 @@ async def predict_image(
              raise HTTPException(status_code=400, detail="Invalid image file")
 
         # Run inference
-        result = service.predict(image)
+        # Through the scheduler: API calls yield to trigger/stream work and are
+        # shed (429/503) before reaching the model if they cannot finish in time.
+        result = await get_scheduler().run_async(
+            service.predict, image, priority=Priority.API, deadline=deadline
+        )
+        
+        verdict_store = get_verdict_store()
+        if verdict_store:
+            verdict_store.record(result, "api", latency_ms=(time.monotonic() - arrival) * 1000)
         
         # Schedule notification task (Fire-and-Forget)
         # We pass 'contents' (original bytes) to avoid re-encoding numpy array
@@ -54,6 +81,10 @@ async def predict_image(
         
     except HTTPException:
         raise
+    except RequestShed as e:
+        logger.warning(f"Prediction request shed: {e.reason}")
+        headers = {"Retry-After": "1"} if e.status_code == 429 else None
+        raise HTTPException(status_code=e.status_code, detail=e.reason, headers=headers)
     except Exception as e:
         logger.error(f"Prediction error: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
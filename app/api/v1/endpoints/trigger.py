@@ -11,6 +11,9 @@ async def simulate_trigger(background_tasks: BackgroundTasks):
     Useful for testing logic without physical sensors.
     """
     listener = get_trigger_listener()
+    if not listener.running:
+        # Pre-forked serving: camera and pusher are owned by another worker
+        raise HTTPException(status_code=503, detail="Trigger listener is not running in this worker", headers={"Retry-After": "0"})
     
     # We run this in background or directly invoke? 
     # invoke directly is fine as it's async and returns void usually
@@ -20,3 +23,14 @@ async def simulate_trigger(background_tasks: BackgroundTasks):
     background_tasks.add_task(listener.process_trigger)
     
     return {"status": "Trigger signal received", "mode": "MOCK" if not listener.is_jetson else "JETSON"}
+
+
+@router.get("/presence/stats")
+async def presence_stats():
+    """
+    Gating statistics of the presence detector (continuous capture mode).
+    """
+    listener = get_trigger_listener()
+    if listener.presence_detector is None:
+        raise HTTPException(status_code=404, detail="Presence gating is disabled (CAPTURE_MODE != 'presence')")
+    return listener.presence_detector.stats()
@@ -0,0 +1,31 @@
+import asyncio
+
+from fastapi import APIRouter, HTTPException, Query
+from app.services.verdict_store import VerdictStore, get_verdict_store
+
+router = APIRouter()
+
+
+def _store() -> VerdictStore:
+    store = get_verdict_store()
+    if store is None:
+        raise HTTPException(status_code=404, detail="Verdict store is disabled (VERDICT_STORE_ENABLED=false)")
+    return store
+
+
+@router.get("/summary")
+async def verdict_summary(minutes: float = Query(60, gt=0, description="Time window, e.g. 480 for an 8h shift")):
+    """
+    Verdict counts, defect rate, counts per class, confidence histogram and
+    latency percentiles over the last `minutes`, from the bucket aggregates.
+    """
+    return await asyncio.to_thread(_store().summary, minutes)
+
+
+@router.get("/series")
+async def verdict_series(minutes: float = Query(60, gt=0, description="Time window")):
+    """
+    Per time bucket (VERDICT_BUCKET_SECONDS, default one minute): count,
+    failures, defect rate, classes and p95 latency.
+    """
+    return await asyncio.to_thread(_store().series, minutes)
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import Optional
+from typing import Any, Dict, List, Optional
 
 class Settings(BaseSettings):
     PROJECT_NAME: str = "GFB-Vision-Eye"
@@ -10,10 +10,98 @@ class Settings(BaseSettings):
     MODEL_PATH: str = "models/yolo26n.pt"
     CONFIDENCE_THRESHOLD: float = 0.5
     IOU_THRESHOLD: float = 0.45
+    # Lean single-image path: own preprocessing + bare forward pass instead of YOLO.predict()
+    FAST_PATH_ENABLED: bool = False
+    # Classifier verdict: PASS only if top class is 'ok' with probability above this
+    OK_CONFIDENCE_THRESHOLD: float = 0.8
+
+    # Cascade: MODEL_PATH runs on everything, these heavier models (in order)
+    # re-score only items whose score falls inside the uncertainty bands
+    CASCADE_MODEL_PATHS: List[str] = []
+    CASCADE_OK_BAND: List[float] = [0.5, 0.95]   # classifier 'ok' probability
+    CASCADE_BOX_BAND: List[float] = [0.5, 0.7]   # detection box confidence
+
+    # Multi-shot fusion: several frames per package, early exit once confident
+    MULTISHOT_ENABLED: bool = False
+    MULTISHOT_MAX_SHOTS: int = 5
+    MULTISHOT_BATCH_SIZE: int = 2
+    MULTISHOT_DECISION_MARGIN: float = 0.1
+    MULTISHOT_BURST_INTERVAL_MS: int = 30
+
+    # Load-adaptive degradation: step down the ladder when queue depth or p95
+    # latency exceed their limits, step back up (with hysteresis) when load drops.
+    # Rungs are cumulative; each changes any of: imgsz, model_path, max_shots, tiling,
+    # tile_size, cascade_stages.
+    LOAD_CONTROL_ENABLED: bool = False
+    DEGRADATION_LADDER: List[Dict[str, Any]] = []
+    LOAD_LATENCY_SLO_MS: float = 150.0
+    LOAD_RECOVER_RATIO: float = 0.6
+    LOAD_QUEUE_HIGH: int = 4
+    LOAD_QUEUE_LOW: int = 1
+    LOAD_WINDOW: int = 50
+    LOAD_MIN_SAMPLES: int = 10
+    LOAD_COOLDOWN_S: float = 5.0
+
+    # Inference scheduling: priority classes (trigger > stream > API) with deadlines
+    SCHEDULER_MAX_QUEUE: int = 16
+    # Budget from sensor trigger to verdict (the pusher fires after this)
+    TRIGGER_DEADLINE_MS: int = 250
+    # Fail safe: a package without a verdict (shed, error, no frames) is pushed off the line
+    REJECT_ON_NO_VERDICT: bool = True
+    # Default budget for /predict without an X-Deadline-Ms header (None = no deadline)
+    API_DEADLINE_MS: Optional[int] = None
+    # With nothing completed for this long, one job is admitted despite the estimate,
+    # so a stale (too high) service time cannot shed deadline jobs forever
+    SCHEDULER_PROBE_INTERVAL_S: float = 1.0
+
+    # Tiled inference (for high-resolution frames with small defects)
+    TILING_ENABLED: bool = False
+    TILE_SIZE: int = 640
+    TILE_OVERLAP: float = 0.2
+    TILE_MERGE_THRESHOLD: float = 0.5
+    # Region of interest in frame pixels: [x1, y1, x2, y2]. Tiles outside are skipped.
+    INSPECTION_ROI: Optional[List[int]] = None
+
+    # Multi-camera station: all cameras capture on one trigger, views are inferred
+    # as one batch and fused (FAIL if any view fails). Each camera is
+    # {"name": "top", "source": 0} where source is a device index, URL or video file.
+    CAMERAS: List[Dict[str, Any]] = []
+    CAMERA_SYNC_TOLERANCE_MS: float = 40.0
+    CAMERA_BUFFER_SIZE: int = 8
+
+    # Session recording for offline replay (scripts/replay_session.py): every
+    # trigger's frames and verdict go to RECORD_SESSION_DIR/<start time>/
+    RECORD_SESSION_DIR: Optional[str] = None
+    RECORD_QUEUE_SIZE: int = 64
+
+    # Local verdict store: append-only SQLite (WAL) log written in batches off the
+    # hot path, with per-bucket aggregates for /api/v1/verdicts queries
+    VERDICT_STORE_ENABLED: bool = False
+    VERDICT_DB_PATH: str = "data/verdicts.db"
+    VERDICT_BUCKET_SECONDS: int = 60
+    VERDICT_BATCH_SIZE: int = 200
+    VERDICT_FLUSH_INTERVAL_S: float = 1.0
+    VERDICT_QUEUE_SIZE: int = 10000
+
+    # Capture mode: "trigger" (photo sensor / API) or "presence" (continuous
+    # capture gated by the presence detector, acts as a software trigger)
+    CAPTURE_MODE: str = "trigger"
+    PRESENCE_DOWNSCALE_WIDTH: int = 160
+    PRESENCE_DIFF_THRESHOLD: int = 25
+    PRESENCE_OCCUPANCY_ON: float = 0.15
+    PRESENCE_OCCUPANCY_OFF: float = 0.05
+    PRESENCE_MOTION_THRESHOLD: float = 0.01
+    PRESENCE_BACKGROUND_ALPHA: float = 0.05
     
     # Server Configuration
     HOST: str = "0.0.0.0"
     PORT: int = 8080
+    # Pre-forked serving (python -m app.server): the master loads the model once
+    # and forks WORKERS processes that share its weights copy-on-write
+    WORKERS: int = 1
+    THREADS_PER_WORKER: Optional[int] = None  # torch/OpenCV threads per worker (default: cores / WORKERS)
+    # Camera and GPIO belong to one process; the pre-fork server enables this in worker 0 only
+    TRIGGER_LISTENER_ENABLED: bool = True
 
     # integrations
     MAIN_SYSTEM_WEBHOOK_URL: Optional[str] = None
@@ -3,7 +3,10 @@ from contextlib import asynccontextmanager
 from app.core.config import settings
 from app.api.routers import router as api_router
 from app.services.inference_service import get_inference_service
+from app.services.scheduler import get_scheduler
+import asyncio
 import logging
+import numpy as np
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -14,20 +17,34 @@ async def lifespan(app: FastAPI):
     # Load model on startup
     logger.info("Loading YOLO model...")
     try:
-        get_inference_service()
+        inference_service = get_inference_service()
         logger.info("Model loaded successfully.")
+        # Warm up off the event loop, then seed the scheduler's service time from
+        # steady-state runs: a slow first live inference must not define it
+        await asyncio.to_thread(inference_service.warmup)
+        blank = np.zeros((640, 640, 3), dtype=np.uint8)
+        await asyncio.to_thread(get_scheduler().calibrate, inference_service.predict, blank)
     except Exception as e:
         logger.error(f"Failed to load model: {e}")
 
     # Start Hardware Trigger Listener
+    # (with pre-forked workers only one of them owns the camera and GPIO)
     from app.services.hardware_trigger import get_trigger_listener
     trigger_service = get_trigger_listener()
-    await trigger_service.start()
+    if settings.TRIGGER_LISTENER_ENABLED:
+        await trigger_service.start()
     
     yield
     
     # Clean up resources
-    await trigger_service.stop()
+    if settings.TRIGGER_LISTENER_ENABLED:
+        await trigger_service.stop()
+    
+    # Flush verdicts still queued for the local store
+    from app.services.verdict_store import get_verdict_store
+    verdict_store = get_verdict_store()
+    if verdict_store:
+        verdict_store.close()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
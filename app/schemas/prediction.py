@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 class BoundingBox(BaseModel):
     x1: float
@@ -10,6 +10,15 @@ class BoundingBox(BaseModel):
     class_id: int
     class_name: str
 
+class ViewEvidence(BaseModel):
+    camera: str
+    skew_ms: float = Field(..., description="Capture time minus trigger time in milliseconds")
+    verdict: str
+    predicted_class: Optional[str] = None
+    confidence: Optional[float] = None
+    defects: List[BoundingBox] = []
+    image_url: Optional[str] = Field(None, description="Evidence image of this view, once uploaded")
+
 class PredictionResult(BaseModel):
     verdict: str = Field(..., description="PASS or FAIL")
     defects: List[BoundingBox] = []
@@ -17,6 +26,11 @@ class PredictionResult(BaseModel):
     model_name: str
     predicted_class: Optional[str] = None
     confidence: Optional[float] = None
+    class_probabilities: Optional[Dict[str, float]] = Field(None, description="Per-class probabilities (classification models)")
+    shots: Optional[int] = Field(None, description="Number of frames fused into this verdict (multi-shot mode)")
+    cascade_stage: Optional[int] = Field(None, description="Cascade stage that decided the item (0 = first, fastest model)")
+    decided_by: Optional[str] = Field(None, description="Model that decided the item (cascade mode)")
+    views: Optional[List[ViewEvidence]] = Field(None, description="Per-camera results (multi-camera stations)")
     
 class ErrorResponse(BaseModel):
     detail: str
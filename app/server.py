@@ -0,0 +1,175 @@
+"""
+Pre-forked serving.
+
+`uvicorn --workers N` spawns fresh interpreters, so every worker imports
+torch and loads its own copy of the weights. Here the master imports the app,
+loads and warms up the models once, binds the listening socket and only then
+forks. Workers inherit the model pages copy-on-write (inference never writes
+to them) and accept on the shared socket; the kernel spreads connections
+across them.
+
+    python -m app.server --workers 4
+
+Worker 0 owns the camera and GPIO (trigger listener); the others only serve
+the API. A worker that dies is restarted with the same index.
+"""
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Dict
+
+import cv2
+import torch
+import uvicorn
+
+from app.core.config import settings
+from app.utils.memory import process_memory
+
+logger = logging.getLogger(__name__)
+
+
+def _bind(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(index: int, sock: socket.socket, app, threads: int):
+    """Body of a forked worker. Never returns."""
+    # Fresh signal handling, uvicorn installs its own
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+    # Split the cores between workers instead of letting each one use them all
+    torch.set_num_threads(threads)
+    cv2.setNumThreads(threads)
+
+    settings.TRIGGER_LISTENER_ENABLED = settings.TRIGGER_LISTENER_ENABLED and index == 0
+
+    logger.info(
+        f"Worker {index} (pid {os.getpid()}) serving with {threads} thread(s)"
+        f"{', owns trigger listener' if settings.TRIGGER_LISTENER_ENABLED else ''}"
+    )
+    config = uvicorn.Config(app, log_level="info", lifespan="on")
+    exit_code = 0
+    try:
+        uvicorn.Server(config).run(sockets=[sock])
+    except Exception as e:
+        logger.error(f"Worker {index} crashed: {e}", exc_info=True)
+        exit_code = 1
+    os._exit(exit_code)
+
+
+class PreforkServer:
+    def __init__(self, workers: int, threads_per_worker: int, host: str, port: int):
+        self.workers = workers
+        self.threads = threads_per_worker
+        self.host = host
+        self.port = port
+        self.children: Dict[int, int] = {}  # pid -> worker index
+        self.stopping = False
+
+    def _spawn(self, index: int, sock: socket.socket, app):
+        pid = os.fork()
+        if pid == 0:
+            _run_worker(index, sock, app, self.threads)
+        self.children[pid] = index
+
+    def _stop(self, signum, frame):
+        self.stopping = True
+        for pid in self.children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def log_memory(self):
+        """Per-process memory; PSS/USS show how much of each worker is really its own."""
+        master = process_memory()
+        if not master:
+            return
+        logger.info(f"Master  (pid {os.getpid()}): rss={master['rss']:.0f}MB pss={master['pss']:.0f}MB uss={master['uss']:.0f}MB")
+        total_pss = master["pss"]
+        for pid, index in sorted(self.children.items(), key=lambda item: item[1]):
+            memory = process_memory(pid)
+            if not memory:
+                continue
+            total_pss += memory["pss"]
+            logger.info(
+                f"Worker {index} (pid {pid}): rss={memory['rss']:.0f}MB pss={memory['pss']:.0f}MB "
+                f"uss={memory['uss']:.0f}MB shared={memory['shared']:.0f}MB"
+            )
+        logger.info(f"Total PSS: {total_pss:.0f}MB for {len(self.children)} worker(s)")
+
+    def run(self):
+        # Everything imported and loaded here ends up in the shared pages
+        from app.main import app
+        from app.services.inference_service import get_inference_service
+
+        logger.info(f"Loading model once in the master (pid {os.getpid()})...")
+        service = get_inference_service()
+        service.warmup()
+        # Objects that exist now are never collected: keeps the GC from
+        # touching (and copying) their pages in every worker
+        gc.collect()
+        gc.freeze()
+
+        sock = _bind(self.host, self.port)
+        logger.info(f"Listening on {self.host}:{self.port} with {self.workers} worker(s), {self.threads} thread(s) each")
+        for index in range(self.workers):
+            self._spawn(index, sock, app)
+
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        memory_logged = False
+        started = time.monotonic()
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                if not memory_logged and time.monotonic() - started > 5:
+                    self.log_memory()
+                    memory_logged = True
+                time.sleep(0.5)
+                continue
+
+            index = self.children.pop(pid, None)
+            if index is None or self.stopping:
+                continue
+            logger.warning(f"Worker {index} (pid {pid}) exited with status {status}, restarting")
+            self._spawn(index, sock, app)
+
+        sock.close()
+        logger.info("All workers stopped.")
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Pre-forked server sharing one model copy between workers")
+    parser.add_argument("--workers", type=int, default=settings.WORKERS, help="Number of worker processes")
+    parser.add_argument("--threads", type=int, default=settings.THREADS_PER_WORKER, help="Torch/OpenCV threads per worker (default: cores / workers)")
+    parser.add_argument("--host", default=settings.HOST)
+    parser.add_argument("--port", type=int, default=settings.PORT)
+    args = parser.parse_args()
+
+    workers = max(1, args.workers)
+    threads = args.threads or max(1, (os.cpu_count() or 1) // workers)
+    if not hasattr(os, "fork"):
+        logger.error("Pre-forked serving needs os.fork(); use `python -m app.main` on this platform.")
+        sys.exit(1)
+    PreforkServer(workers, threads, args.host, args.port).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+from app.schemas.prediction import PredictionResult, ViewEvidence
+from app.services.multishot import MultiShotAggregator
+
+logger = logging.getLogger(__name__)
+
+
+class CameraGrabber:
+    """
+    Reads one camera continuously on its own thread and keeps the last few
+    frames with their capture timestamps (time.monotonic()).
+
+    `source` is a device index or a path/URL. Video files stand in for
+    cameras in tests: they are played at their own FPS and looped, so they
+    behave like a live stream. A file that yields no frame even after
+    rewinding (empty or corrupt) stops its grabber.
+    """
+
+    # Consecutive failed reads of a file source before the grabber gives up
+    MAX_EMPTY_READS = 8
+
+    def __init__(self, name: str, source: Union[int, str], buffer_size: int = settings.CAMERA_BUFFER_SIZE):
+        self.name = name
+        self.source = source
+        self.frames = deque(maxlen=buffer_size)  # (timestamp, frame)
+        self.condition = threading.Condition()
+        self.running = False
+        self.thread: Optional[threading.Thread] = None
+        self.cap: Optional[cv2.VideoCapture] = None
+        self.is_file = isinstance(source, str) and not source.isdigit() and "://" not in source
+
+    def start(self) -> bool:
+        source = int(self.source) if isinstance(self.source, str) and self.source.isdigit() else self.source
+        self.cap = cv2.VideoCapture(source)
+        if not self.cap.isOpened():
+            logger.warning(f"Camera '{self.name}' ({self.source}) could not be opened.")
+            return False
+        self.running = True
+        self.thread = threading.Thread(target=self._grab_loop, name=f"grabber-{self.name}", daemon=True)
+        self.thread.start()
+        return True
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=1.0)
+        if self.cap:
+            self.cap.release()
+
+    def _grab_loop(self):
+        fps = self.cap.get(cv2.CAP_PROP_FPS) if self.is_file else 0
+        interval = 1.0 / fps if fps and fps > 0 else 0.0
+        next_read = time.monotonic()
+        empty_reads = 0
+
+        while self.running:
+            ret, frame = self.cap.read()
+            if not ret:
+                if self.is_file:
+                    empty_reads += 1
+                    if empty_reads >= self.MAX_EMPTY_READS:
+                        logger.error(f"Camera '{self.name}' ({self.source}) yields no frames, stopping its grabber.")
+                        self.running = False
+                        with self.condition:
+                            self.condition.notify_all()
+                        break
+                    # End of the simulated stream: loop, backing off if the rewind does not help
+                    self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    if empty_reads > 1:
+                        time.sleep(min(0.01 * 2 ** (empty_reads - 2), 1.0))
+                    continue
+                time.sleep(0.01)
+                continue
+            empty_reads = 0
+
+            timestamp = time.monotonic()
+            with self.condition:
+                self.frames.append((timestamp, frame))
+                self.condition.notify_all()
+
+            if interval:
+                next_read += interval
+                time.sleep(max(0.0, next_read - time.monotonic()))
+
+    def frame_at(self, timestamp: float, tolerance: float) -> Optional[Tuple[float, np.ndarray]]:
+        """
+        Frame captured closest to `timestamp`, within `tolerance` seconds.
+        Waits for the next frame if the trigger is newer than everything buffered.
+        """
+        wait_until = timestamp + tolerance
+        with self.condition:
+            while self.running and (not self.frames or self.frames[-1][0] < timestamp):
+                remaining = wait_until - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.condition.wait(remaining)
+            candidates = [(abs(ts - timestamp), ts, frame) for ts, frame in self.frames]
+
+        if not candidates:
+            return None
+        skew, ts, frame = min(candidates, key=lambda c: c[0])
+        if skew > tolerance:
+            return None
+        return ts, frame
+
+
+class CameraStation:
+    """
+    N cameras that capture one package on one trigger (e.g. top + side views).
+
+    Every camera has its own grabber thread; on a trigger each contributes
+    the frame closest to the trigger time. Cameras without a frame within
+    CAMERA_SYNC_TOLERANCE_MS are left out of that package (and logged), the
+    remaining views are still inspected.
+    """
+
+    def __init__(self, cameras: List[Dict[str, Any]], tolerance_ms: float = settings.CAMERA_SYNC_TOLERANCE_MS):
+        self.grabbers = [
+            CameraGrabber(camera.get("name", f"cam{i}"), camera["source"])
+            for i, camera in enumerate(cameras)
+        ]
+        self.tolerance = tolerance_ms / 1000
+
+        # Metrics
+        self.captures = 0
+        self.missing_views = {grabber.name: 0 for grabber in self.grabbers}
+
+    @property
+    def names(self) -> List[str]:
+        return [grabber.name for grabber in self.grabbers]
+
+    @property
+    def running(self) -> bool:
+        return any(grabber.running for grabber in self.grabbers)
+
+    def start(self) -> int:
+        """Starts all grabbers, returns how many cameras opened."""
+        opened = sum(1 for grabber in self.grabbers if grabber.start())
+        logger.info(f"Camera station: {opened}/{len(self.grabbers)} cameras running ({', '.join(self.names)})")
+        return opened
+
+    def stop(self):
+        for grabber in self.grabbers:
+            grabber.stop()
+
+    def capture(self, trigger_time: float) -> List[Tuple[str, float, np.ndarray]]:
+        """
+        Synchronized views of one package: (camera name, skew in seconds, frame).
+        Blocks up to the tolerance, run it off the event loop.
+        """
+        self.captures += 1
+        views = []
+        for grabber in self.grabbers:
+            match = grabber.frame_at(trigger_time, self.tolerance)
+            if match is None:
+                self.missing_views[grabber.name] += 1
+                logger.warning(f"Camera '{grabber.name}': no frame within {self.tolerance * 1000:.0f}ms of the trigger")
+                continue
+            timestamp, frame = match
+            views.append((grabber.name, timestamp - trigger_time, frame))
+        return views
+
+    def stats(self) -> dict:
+        return {
+            "cameras": self.names,
+            "captures": self.captures,
+            "missing_views": dict(self.missing_views),
+            "tolerance_ms": self.tolerance * 1000,
+        }
+
+
+def fuse_views(
+    views: List[Tuple[str, float, np.ndarray]],
+    predictions: List[PredictionResult],
+) -> PredictionResult:
+    """
+    One verdict per package from one prediction per view: the package fails
+    if any view fails (a tear may only be visible from the side). The
+    top-level class/boxes come from the deciding view: the most confident
+    failing view, or the least confident passing one. Every view keeps its
+    own result in `views`.
+    """
+    evidence = [
+        ViewEvidence(
+            camera=name,
+            skew_ms=skew * 1000,
+            verdict=prediction.verdict,
+            predicted_class=prediction.predicted_class,
+            confidence=prediction.confidence,
+            defects=prediction.defects,
+        )
+        for (name, skew, _), prediction in zip(views, predictions)
+    ]
+
+    # Lowest 'ok' score = strongest evidence of a defect
+    deciding = min(predictions, key=MultiShotAggregator._ok_score)
+    verdict = "FAIL" if any(p.verdict == "FAIL" for p in predictions) else "PASS"
+
+    return PredictionResult(
+        verdict=verdict,
+        defects=deciding.defects if verdict == "FAIL" else [],
+        inference_time=sum(p.inference_time for p in predictions),
+        model_name=deciding.model_name,
+        predicted_class=deciding.predicted_class,
+        confidence=deciding.confidence,
+        class_probabilities=deciding.class_probabilities,
+        views=evidence,
+        **MultiShotAggregator._cascade_fields(predictions),
+    )
@@ -0,0 +1,140 @@
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+import torch
+
+try:
+    from ultralytics.utils.nms import non_max_suppression
+except ImportError:  # older Ultralytics releases kept NMS in ops
+    from ultralytics.utils.ops import non_max_suppression
+
+
+class DirectPredictor:
+    """
+    Lean single-image path around an already loaded Ultralytics network.
+
+    Skips the generic `YOLO.predict()` machinery (source loading, argument
+    merging, per-call setup, `Results` objects): the frame is letterboxed
+    (detection) or resized + centre-cropped (classification) straight into a
+    preallocated canvas, copied into a reused input tensor and run under
+    `torch.inference_mode`. Outputs are plain numpy arrays.
+
+    Detection preprocessing is Ultralytics' own: the minimum-rectangle
+    letterbox with bilinear resize. Classification follows the geometry of
+    classify_transforms (shortest side to imgsz, centre crop), but Ultralytics
+    resizes with PIL, which antialiases when downscaling. cv2.INTER_AREA is
+    used for that instead: not bit-exact (mean difference below one grey
+    level, up to ~15% on isolated edge pixels), but much cheaper than PIL on
+    camera-sized frames; plain bilinear would be off by up to ~45%. Check with
+    `scripts/benchmark_fast_path.py --preprocess-check`. Buffers are allocated
+    once per frame shape, which for a fixed camera means once.
+    """
+
+    def __init__(self, yolo, imgsz: Optional[int] = None):
+        self.network = yolo.model
+        self.network.eval()
+        if hasattr(self.network, "fuse"):
+            # Same Conv+BN fusion Ultralytics' AutoBackend applies; no-op if already fused
+            self.network.fuse(verbose=False)
+
+        self.task = yolo.task
+        self.names: Dict[int, str] = self.network.names
+        self.end2end = getattr(self.network, "end2end", False)
+        self.stride = int(max(self.network.stride)) if hasattr(self.network, "stride") else 32
+        self.device = next(self.network.parameters()).device
+
+        if imgsz is None:
+            imgsz = self.network.args.get("imgsz", 640) if isinstance(self.network.args, dict) else 640
+        self.imgsz = int(imgsz[0] if isinstance(imgsz, (list, tuple)) else imgsz)
+
+        self.buffers: Dict[Tuple[int, int], _Buffers] = {}
+
+    def _buffers_for(self, shape: Tuple[int, int]) -> "_Buffers":
+        buffers = self.buffers.get(shape)
+        if buffers is None:
+            buffers = self.buffers[shape] = _Buffers(*self._layout(shape), self.device)
+        return buffers
+
+    def _layout(self, shape: Tuple[int, int]):
+        """Canvas size and placement of the resized frame inside it, as Ultralytics computes them."""
+        h, w = shape
+        if self.task == "classify":
+            # classify_transforms: shortest side to imgsz (torchvision truncates the long
+            # side), then a centre crop with torchvision's rounding
+            short, long = min(h, w), max(h, w)
+            new_long = int(self.imgsz * long / short)
+            new_w, new_h = (new_long, self.imgsz) if w >= h else (self.imgsz, new_long)
+            crop = (int(round((new_w - self.imgsz) / 2.0)), int(round((new_h - self.imgsz) / 2.0)))
+            return (self.imgsz, self.imgsz), (new_w, new_h), crop, self.imgsz / short
+
+        # LetterBox(auto=True): keep aspect ratio, pad to a multiple of the stride
+        gain = min(self.imgsz / h, self.imgsz / w)
+        new_w, new_h = round(w * gain), round(h * gain)
+        dw = ((self.imgsz - new_w) % self.stride) / 2
+        dh = ((self.imgsz - new_h) % self.stride) / 2
+        top, bottom = round(dh - 0.1), round(dh + 0.1)
+        left, right = round(dw - 0.1), round(dw + 0.1)
+        return (new_h + top + bottom, new_w + left + right), (new_w, new_h), (left, top), gain
+
+    @torch.inference_mode()
+    def preprocess(self, image: np.ndarray) -> torch.Tensor:
+        """BGR frame -> (1, 3, H, W) float input in [0, 1]. The tensor is a reused buffer."""
+        h, w = image.shape[:2]
+        buffers = self._buffers_for((h, w))
+        new_w, new_h = buffers.resized_size
+        if (new_w, new_h) == (w, h):
+            resized = image
+        else:
+            # Area averaging stands in for PIL's antialiased downscale of classify_transforms
+            downscale = self.task == "classify" and new_w < w
+            resized = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_AREA if downscale else cv2.INTER_LINEAR)
+
+        canvas_h, canvas_w = buffers.canvas.shape[:2]
+        if self.task == "classify":
+            left, top = buffers.offset
+            cv2.cvtColor(resized[top:top + canvas_h, left:left + canvas_w], cv2.COLOR_BGR2RGB, dst=buffers.canvas)
+        else:
+            pad_x, pad_y = buffers.offset
+            cv2.cvtColor(resized, cv2.COLOR_BGR2RGB, dst=buffers.canvas[pad_y:pad_y + new_h, pad_x:pad_x + new_w])
+
+        buffers.input[0].copy_(buffers.canvas_chw)
+        buffers.input.mul_(1 / 255)
+        return buffers.input
+
+    @torch.inference_mode()
+    def __call__(self, image: np.ndarray, conf: float, iou: float) -> np.ndarray:
+        """
+        Classification: (num_classes,) probabilities.
+        Detection: (N, 6) [x1, y1, x2, y2, conf, cls] in frame coordinates.
+        """
+        h, w = image.shape[:2]
+        buffers = self._buffers_for((h, w))
+        output = self.network(self.preprocess(image))
+        if isinstance(output, (list, tuple)):
+            output = output[0]
+
+        if self.task == "classify":
+            return output[0].float().cpu().numpy()
+
+        # NMS-free (end2end) heads are only filtered by confidence
+        detections = non_max_suppression(output, conf, iou, end2end=self.end2end)[0]
+
+        detections = detections.float().cpu().numpy()
+        pad_x, pad_y = buffers.offset
+        detections[:, [0, 2]] = ((detections[:, [0, 2]] - pad_x) / buffers.gain).clip(0, w)
+        detections[:, [1, 3]] = ((detections[:, [1, 3]] - pad_y) / buffers.gain).clip(0, h)
+        return detections
+
+
+class _Buffers:
+    """Preallocated canvas (uint8 HWC, padding pre-filled with 114) and input tensor for one frame shape."""
+
+    def __init__(self, canvas_shape, resized_size, offset, gain, device):
+        self.canvas = np.full((*canvas_shape, 3), 114, dtype=np.uint8)
+        self.resized_size = resized_size
+        self.offset = offset
+        self.gain = gain
+        self.input = torch.zeros((1, 3, *canvas_shape), dtype=torch.float32, device=device)
+        # Zero-copy CHW view of the canvas; copied into self.input each call
+        self.canvas_chw = torch.from_numpy(self.canvas).permute(2, 0, 1)
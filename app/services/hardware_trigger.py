@@ -3,10 +3,22 @@ import asyncio
 import logging
 import platform
 import time
-from typing import Optional, Callable
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional, Callable, Tuple
 import cv2
 import numpy as np
+from app.core.config import settings
+from app.schemas.prediction import PredictionResult
+from app.services.camera_station import CameraStation, fuse_views
 from app.services.inference_service import get_inference_service
+from app.services.multishot import FrameSource, MultiShotAggregator, list_source
+from app.services.presence_detector import PresenceDetector
+from app.services.notifier import notifier_service
+from app.services.scheduler import Priority, RequestShed, get_scheduler
+from app.services.session_recorder import CapturedFrame, SessionRecorder
+from app.services.verdict_store import get_verdict_store
+from app.utils.s3_client import s3_client
 
 # Try importing Jetson.GPIO, fallback to Mock if not available
 try:
@@ -26,7 +38,39 @@ class TriggerListener:
     def __init__(self):
         self.running = False
         self.inference_service = get_inference_service()
+        self.scheduler = get_scheduler()
         self.cap: Optional[cv2.VideoCapture] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        
+        # Software trigger for lines without a photo sensor
+        self.presence_mode = settings.CAPTURE_MODE == "presence"
+        self.presence_detector = PresenceDetector(
+            roi=settings.INSPECTION_ROI,
+            max_shots=settings.MULTISHOT_MAX_SHOTS if settings.MULTISHOT_ENABLED else 1,
+        ) if self.presence_mode else None
+        
+        # Several frames per package, fused with early exit
+        self.multishot = MultiShotAggregator(self.inference_service) if settings.MULTISHOT_ENABLED else None
+        
+        # Multi-camera station: one synchronized frame per camera on each trigger
+        self.station = CameraStation(settings.CAMERAS) if settings.CAMERAS else None
+        
+        # Session recording for offline replay (started with the listener)
+        self.recorder: Optional[SessionRecorder] = None
+        
+        # Local verdict log + shift aggregates
+        self.verdict_store = get_verdict_store()
+        
+        # Without a camera, triggers are served a synthetic frame (demo/mock mode);
+        # the session replayer turns this off
+        self.allow_mock_frames = True
+        
+        # Station evidence goes to S3 and the main system's webhook; the
+        # session replayer turns this off
+        self.publish_evidence = True
+        
+        # Items that got no verdict, by reason ("shed", "error", "no_frames")
+        self.no_verdicts = {"shed": 0, "error": 0, "no_frames": 0}
         
         # Determine mode
         self.is_jetson = GPIO_AVAILABLE
@@ -35,12 +79,20 @@ class TriggerListener:
     async def start(self):
         """Starts the trigger listener loop."""
         self.running = True
+        self.loop = asyncio.get_running_loop()
         
         # Initialize Camera
-        # Using index 0. On Jetson typically /dev/video0
-        self.cap = cv2.VideoCapture(0)
-        if not self.cap.isOpened():
-            logger.warning("Camera not found! Will rely on mock images if triggered.")
+        if self.station:
+            # Cameras are owned by the station's grabber threads
+            if not self.station.start():
+                logger.warning("No station camera could be opened! Will rely on mock images if triggered.")
+            if self.multishot or self.presence_mode:
+                logger.warning("Multi-shot and presence gating are single-camera features, station triggers use one shot per view.")
+        else:
+            # Using index 0. On Jetson typically /dev/video0
+            self.cap = cv2.VideoCapture(0)
+            if not self.cap.isOpened():
+                logger.warning("Camera not found! Will rely on mock images if triggered.")
         
         # Initialize GPIO
         if self.is_jetson:
@@ -55,14 +107,27 @@ class TriggerListener:
                 logger.error(f"GPIO Setup failed: {e}")
                 self.is_jetson = False # Fallback to mock behavior if setup fails
         
+        if settings.RECORD_SESSION_DIR:
+            session_dir = Path(settings.RECORD_SESSION_DIR) / datetime.now().strftime("%Y%m%d_%H%M%S")
+            self.recorder = SessionRecorder(str(session_dir))
+        
         # Start loop (mostly for mock mode or keeping service alive)
         asyncio.create_task(self._loop())
+        
+        if self.presence_mode:
+            logger.info("Presence gating enabled: continuous capture, inference once per package.")
+            asyncio.create_task(self._presence_loop())
 
     async def stop(self):
         """Stops the listener and cleans up resources."""
         self.running = False
         if self.cap:
             self.cap.release()
+        if self.station:
+            self.station.stop()
+        if self.recorder:
+            self.recorder.close()
+            self.recorder = None
         
         if self.is_jetson:
             GPIO.cleanup()
@@ -71,8 +136,10 @@ class TriggerListener:
     def on_trigger_event(self, channel):
         """Callback for GPIO interrupt (Run in separate thread via Jetson.GPIO)."""
         logger.info("Physical Trigger Detected!")
+        # Stamp here: station cameras pick the frames closest to the sensor edge
+        trigger_time = time.monotonic()
         # Fire and forget processing loop
-        asyncio.run_coroutine_threadsafe(self.process_trigger(), asyncio.get_event_loop())
+        asyncio.run_coroutine_threadsafe(self.process_trigger(trigger_time), self.loop)
 
     async def _loop(self):
         """Simulation loop for Mock mode."""
@@ -90,49 +157,197 @@ class TriggerListener:
                 pass
             await asyncio.sleep(1)
 
-    async def process_trigger(self):
+    async def _presence_loop(self):
+        """Continuous capture: the presence detector decides which frames reach the model."""
+        while self.running:
+            if not (self.cap and self.cap.isOpened()):
+                await asyncio.sleep(1)
+                continue
+            
+            ret, frame = await asyncio.to_thread(self.cap.read)
+            if not ret:
+                await asyncio.sleep(0.01)
+                continue
+            
+            best_frame = self.presence_detector.update(frame)
+            if best_frame is not None:
+                logger.info("Package detected by presence gate.")
+                asyncio.create_task(self._inspect_presence(best_frame, list(self.presence_detector.shots), time.monotonic()))
+
+    async def _inspect_presence(self, best_frame: np.ndarray, shots: List[np.ndarray], detected_time: float):
+        """Inference -> Action for a package found by the presence gate."""
+        deadline = detected_time + settings.TRIGGER_DEADLINE_MS / 1000
+        if self.multishot:
+            # Best-centred frames tracked while the package crossed the ROI
+            frames = shots or [best_frame]
+            result = await self.process_shots(list_source(frames), Priority.STREAM, deadline)
+        else:
+            frames = [best_frame]
+            result = await self.process_frame(best_frame, Priority.STREAM, deadline)
+        self._log_verdict(result, "presence", detected_time)
+        if self.recorder:
+            # The gate does not keep capture times of its shots: all are stamped with the detection
+            self.recorder.record(detected_time, [("main", detected_time, frame) for frame in frames], result, time.monotonic(), source="presence")
+
+    async def process_trigger(self, trigger_time: Optional[float] = None):
         """Main logic: Capture -> Inference -> Action."""
         logger.info("Processing Trigger...")
+        trigger_time = trigger_time if trigger_time is not None else time.monotonic()
+        # The pusher acts a fixed time after the sensor; a later verdict is useless
+        deadline = trigger_time + settings.TRIGGER_DEADLINE_MS / 1000
+        
+        # Every frame this item used, for the session recorder
+        captured: List[CapturedFrame] = []
         
-        # 1. Capture Frame
-        frame = self.capture_frame()
-        if frame is None:
-            logger.error("Failed to capture frame.")
-            return
+        if self.station and self.station.running:
+            views = await asyncio.to_thread(self.station.capture, trigger_time)
+            if not views:
+                result = await self._no_verdict("no_frames", "No camera of the station delivered a frame in time")
+                self._log_verdict(result, "trigger", trigger_time)
+                return
+            captured = [(name, trigger_time + skew, frame) for name, skew, frame in views]
+            result = await self.process_views(views, Priority.TRIGGER, deadline)
+        else:
+            # 1. Capture Frame
+            frame = self.capture_frame(allow_mock=self.allow_mock_frames)
+            if frame is None:
+                result = await self._no_verdict("no_frames", "Failed to capture frame")
+                self._log_verdict(result, "trigger", trigger_time)
+                return
+            captured.append(("main", time.monotonic(), frame))
+
+            if self.multishot:
+                # Further shots of the burst are only captured if the first ones are not conclusive
+                result = await self.process_shots(self._burst_source(frame, captured), Priority.TRIGGER, deadline)
+            else:
+                result = await self.process_frame(frame, Priority.TRIGGER, deadline)
+
+        self._log_verdict(result, "trigger", trigger_time)
+        if self.recorder:
+            self.recorder.record(trigger_time, captured, result, time.monotonic())
+
+    def _log_verdict(self, result: Optional[PredictionResult], source: str, start_time: float):
+        """Appends the verdict to the local store (queued, written off the hot path)."""
+        if result is not None and self.verdict_store:
+            self.verdict_store.record(result, source, latency_ms=(time.monotonic() - start_time) * 1000)
 
+    async def process_frame(self, frame: np.ndarray, priority: Priority = Priority.TRIGGER, deadline: Optional[float] = None):
+        """Inference -> Action for an already captured frame."""
         # 2. Inference
         try:
-            # Inference service expects bytes or file. 
-            # We have a numpy array. We need to encode it.
-            success, encoded_img = cv2.imencode('.jpg', frame)
-            if not success:
-                logger.error("Failed to encode frame.")
-                return
-            
-            # Send to inference
-            # Note: InferenceService.predict takes bytes
-            image_bytes = encoded_img.tobytes()
-            # We likely need a way to call predict directly without async http overhead if internal?
-            # app.services.inference_service.InferenceService usually has a 'predict' method.
-            # Let's verify signature. It probably takes bytes.
-            
-            result = await self.inference_service.predict(image_bytes)
-            
-            verdict = result.get("verdict", "UNKNOWN")
-            logger.info(f"Verdict: {verdict} | Class: {result.get('predicted_class')}")
-            
-            # 3. Action
-            if verdict == "FAIL":
-                await self.activate_pusher()
-                
+            # Via the scheduler (CPU bound work runs on its worker thread, off the event loop)
+            result = await self.scheduler.run_async(
+                self.inference_service.predict, frame, priority=priority, deadline=deadline
+            )
+            await self.handle_result(result)
+            return result
+        except RequestShed as e:
+            return await self._no_verdict("shed", f"Verdict missed its deadline: {e.reason}")
         except Exception as e:
-            logger.error(f"Error during processing: {e}")
+            return await self._no_verdict("error", f"Error during processing: {e}")
+
+    async def process_shots(self, next_frames: FrameSource, priority: Priority = Priority.TRIGGER, deadline: Optional[float] = None):
+        """Inference on several frames of one package, fused into one verdict -> Action."""
+        def predict_batch(frames: List[np.ndarray], conf: float) -> List[PredictionResult]:
+            return self.scheduler.run(
+                self.inference_service.predict_batch, frames, conf, priority=priority, deadline=deadline
+            )
+
+        try:
+            result = await asyncio.to_thread(self.multishot.run, next_frames, predict_batch)
+            if result is None:
+                return await self._no_verdict("no_frames", "No frames available for multi-shot inference")
+            await self.handle_result(result)
+            return result
+        except RequestShed as e:
+            return await self._no_verdict("shed", f"Verdict missed its deadline: {e.reason}")
+        except Exception as e:
+            return await self._no_verdict("error", f"Error during processing: {e}")
+
+    async def process_views(self, views: List[Tuple[str, float, np.ndarray]], priority: Priority = Priority.TRIGGER, deadline: Optional[float] = None):
+        """All views of one package in one batched inference call, fused into one verdict -> Action."""
+        try:
+            predictions = await self.scheduler.run_async(
+                self.inference_service.predict_batch, [frame for _, _, frame in views],
+                priority=priority, deadline=deadline
+            )
+            result = fuse_views(views, predictions)
+            await self.handle_result(result)
+        except RequestShed as e:
+            return await self._no_verdict("shed", f"Verdict missed its deadline: {e.reason}")
+        except Exception as e:
+            return await self._no_verdict("error", f"Error during processing: {e}")
+
+        # Evidence after the pusher decision, off the critical path
+        if self.publish_evidence:
+            asyncio.create_task(self._upload_evidence(result, views))
+        return result
+
+    async def _upload_evidence(self, result: PredictionResult, views: List[Tuple[str, float, np.ndarray]]):
+        """Uploads one JPEG per view and sends the bundle to the main system."""
+        try:
+            for view, (_, _, frame) in zip(result.views, views):
+                ok, encoded = await asyncio.to_thread(cv2.imencode, ".jpg", frame)
+                if ok:
+                    view.image_url = await s3_client.upload(encoded.tobytes())
+            # Top-level evidence: the first failing view, if any
+            image_url = next((v.image_url for v in result.views if v.verdict == "FAIL"), result.views[0].image_url)
+            await notifier_service.send_inspection_result(result, image_url)
+        except Exception as e:
+            logger.error(f"Evidence upload failed: {e}")
+
+    async def _no_verdict(self, reason: str, message: str) -> PredictionResult:
+        """
+        An item the model could not decide on. Fails safe: with
+        REJECT_ON_NO_VERDICT the pusher fires, an uninspected package must not
+        pass. Returned as its own NO_VERDICT outcome for the verdict store.
+        """
+        self.no_verdicts[reason] += 1
+        action = "rejecting" if settings.REJECT_ON_NO_VERDICT else "NOT rejecting (REJECT_ON_NO_VERDICT=false)"
+        logger.error(f"{message}. No verdict, {action} the item.")
+        if settings.REJECT_ON_NO_VERDICT:
+            await self.activate_pusher()
+        return PredictionResult(verdict="NO_VERDICT", inference_time=0.0, model_name="none")
+
+    async def handle_result(self, result: PredictionResult):
+        verdict = result.verdict
+        logger.info(f"Verdict: {verdict} | Class: {result.predicted_class} | Shots: {result.shots or 1}")
+        
+        # 3. Action
+        if verdict == "FAIL":
+            await self.activate_pusher()
+
+    def _burst_source(self, first_frame: np.ndarray, captured: Optional[List[CapturedFrame]] = None) -> FrameSource:
+        """
+        Frame source for a trigger burst. Runs in a worker thread, so blocking reads are fine.
+        Newly captured frames are appended to `captured` if given. The burst ends
+        (fewer frames than asked) when the camera has no further frame; mock frames
+        are never fused into a verdict.
+        """
+        pending = [first_frame]
+
+        def next_frames(n: int) -> List[np.ndarray]:
+            frames = pending[:n]
+            del pending[:n]
+            while len(frames) < n:
+                time.sleep(settings.MULTISHOT_BURST_INTERVAL_MS / 1000)
+                frame = self.capture_frame(allow_mock=False)
+                if frame is None:
+                    break
+                frames.append(frame)
+                if captured is not None:
+                    captured.append(("main", time.monotonic(), frame))
+            return frames
+
+        return next_frames
 
-    def capture_frame(self) -> Optional[np.ndarray]:
+    def capture_frame(self, allow_mock: bool = True) -> Optional[np.ndarray]:
         if self.cap and self.cap.isOpened():
             ret, frame = self.cap.read()
             if ret:
                 return frame
+        if not allow_mock:
+            return None
         
         # Mock frame if camera fails or in mock mode
         logger.warning("Using generated MOCK frame.")
@@ -0,0 +1,169 @@
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class LoadController:
+    """
+    Keeps verdicts on time when the line outruns the CPU.
+
+    Watches the number of requests waiting for the model and the p95 of
+    recent end-to-end inference latency. When either goes above its limit
+    the service steps one rung down DEGRADATION_LADDER (e.g. smaller imgsz,
+    then a lighter model, then fewer shots / no tiling); when both are
+    comfortably below it steps back up. Hysteresis comes from the gap
+    between the degrade and recover limits plus a cooldown between changes.
+
+    Level 0 is full quality (no overrides). Level i > 0 applies the rungs
+    DEGRADATION_LADDER[0..i-1] on top of each other, so every rung only names
+    what it changes. A rung is a dict with any of:
+    imgsz, model_path, max_shots, tiling, tile_size, cascade_stages.
+    """
+
+    def __init__(
+        self,
+        ladder: Optional[List[Dict[str, Any]]] = None,
+        enabled: bool = settings.LOAD_CONTROL_ENABLED,
+        latency_slo_ms: float = settings.LOAD_LATENCY_SLO_MS,
+        recover_ratio: float = settings.LOAD_RECOVER_RATIO,
+        queue_high: int = settings.LOAD_QUEUE_HIGH,
+        queue_low: int = settings.LOAD_QUEUE_LOW,
+        window: int = settings.LOAD_WINDOW,
+        min_samples: int = settings.LOAD_MIN_SAMPLES,
+        cooldown_s: float = settings.LOAD_COOLDOWN_S,
+    ):
+        self.ladder: List[Dict[str, Any]] = [{}]
+        for rung in (ladder if ladder is not None else settings.DEGRADATION_LADDER):
+            self.ladder.append({**self.ladder[-1], **rung})
+        self.enabled = enabled and len(self.ladder) > 1
+        self.latency_slo_ms = latency_slo_ms
+        self.recover_ratio = recover_ratio
+        self.queue_high = queue_high
+        self.queue_low = queue_low
+        self.min_samples = min_samples
+        self.cooldown_s = cooldown_s
+
+        self.level = 0
+        self.queue_depth = 0  # requests inside track() (waiting for or holding the model)
+        self.waiting = 0      # requests still queued in the scheduler
+        self.latencies = deque(maxlen=window)
+        self.last_change = 0.0
+        self.lock = threading.Lock()
+
+        # Metrics
+        self.requests = 0
+        self.degrade_steps = 0
+        self.recover_steps = 0
+        self.last_decision: Optional[Dict[str, Any]] = None
+
+    def setting(self, key: str, default: Any = None) -> Any:
+        """Override of the current ladder level for `key`, or `default` at full quality."""
+        return self.ladder[self.level].get(key, default)
+
+    @contextmanager
+    def track(self):
+        """
+        Wraps one inference request: it counts as queued until it leaves the
+        block, and its end-to-end latency feeds the controller.
+        """
+        start_time = time.perf_counter()
+        with self.lock:
+            self.queue_depth += 1
+            self.requests += 1
+        try:
+            yield
+        finally:
+            latency = time.perf_counter() - start_time
+            with self.lock:
+                self.queue_depth -= 1
+                self.latencies.append(latency)
+                self._evaluate()
+
+    def p95_ms(self) -> float:
+        if not self.latencies:
+            return 0.0
+        return float(np.percentile(self.latencies, 95) * 1000)
+
+    def _evaluate(self):
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        if now - self.last_change < self.cooldown_s:
+            return
+
+        p95 = self.p95_ms()
+        depth = self.queue_depth + self.waiting
+        enough = len(self.latencies) >= self.min_samples
+        overloaded = depth >= self.queue_high or (enough and p95 > self.latency_slo_ms)
+        relaxed = (
+            enough
+            and depth <= self.queue_low
+            and p95 < self.latency_slo_ms * self.recover_ratio
+        )
+
+        if overloaded and self.level < len(self.ladder) - 1:
+            self._change(self.level + 1, now, p95)
+        elif relaxed and self.level > 0:
+            self._change(self.level - 1, now, p95)
+
+    def _change(self, level: int, now: float, p95: float):
+        previous = self.level
+        self.level = level
+        self.last_change = now
+        # Latencies measured at the old level say nothing about the new one
+        self.latencies.clear()
+
+        self.last_decision = {
+            "timestamp": time.time(),
+            "from_level": previous,
+            "to_level": level,
+            "p95_ms": round(p95, 1),
+            "queue_depth": self.queue_depth + self.waiting,
+            "settings": self.ladder[level],
+        }
+        if level > previous:
+            self.degrade_steps += 1
+            logger.warning(
+                f"Load control: degrading to level {level} {self.ladder[level]} "
+                f"(p95={p95:.0f}ms, SLO={self.latency_slo_ms:.0f}ms, queue={self.queue_depth + self.waiting})"
+            )
+        else:
+            self.recover_steps += 1
+            logger.info(
+                f"Load control: recovering to level {level} {self.ladder[level] or '(full quality)'} "
+                f"(p95={p95:.0f}ms, queue={self.queue_depth + self.waiting})"
+            )
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "level": self.level,
+            "max_level": len(self.ladder) - 1,
+            "level_settings": self.ladder[self.level],
+            "queue_depth": self.queue_depth + self.waiting,
+            "latency_p95_ms": self.p95_ms(),
+            "latency_slo_ms": self.latency_slo_ms,
+            "requests": self.requests,
+            "degrade_steps": self.degrade_steps,
+            "recover_steps": self.recover_steps,
+            "last_decision": self.last_decision,
+        }
+
+
+# Global instance
+load_controller = None
+
+def get_load_controller() -> LoadController:
+    global load_controller
+    if load_controller is None:
+        load_controller = LoadController()
+    return load_controller
@@ -0,0 +1,177 @@
+import logging
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.schemas.prediction import PredictionResult
+from app.services.inference_service import ModelInference
+from app.services.load_controller import get_load_controller
+from app.services.scheduler import RequestShed
+
+logger = logging.getLogger(__name__)
+
+# Returns up to n new frames of the same package (fewer or none when exhausted)
+FrameSource = Callable[[int], List[np.ndarray]]
+# Predicts a batch of frames, detectors keeping boxes down to the given confidence
+BatchPredictor = Callable[[List[np.ndarray], float], List[PredictionResult]]
+
+
+def list_source(frames: List[np.ndarray]) -> FrameSource:
+    """Frame source over frames that were already captured (e.g. from stream tracking)."""
+    remaining = list(frames)
+
+    def next_frames(n: int) -> List[np.ndarray]:
+        taken = remaining[:n]
+        del remaining[:n]
+        return taken
+
+    return next_frames
+
+
+class MultiShotAggregator:
+    """
+    Fuses several frames of the same package into one verdict.
+
+    Frames are requested from the source in small batches: one shot first,
+    then MULTISHOT_BATCH_SIZE at a time. After every batch the shots are fused
+    and the loop stops as soon as the fused 'ok' score is at least
+    MULTISHOT_DECISION_MARGIN away from the decision threshold, so clear
+    packages cost a single inference and only ambiguous ones use more shots.
+
+    - Classification: class probabilities are averaged; the verdict rule is
+      the same as for a single frame (top class 'ok' above OK_CONFIDENCE_THRESHOLD).
+    - Detection: shots run with boxes down to the lower edge of
+      CASCADE_BOX_BAND and each scores 1 - (highest defect confidence). Shots
+      are fused by their lowest score, so the package fails as soon as any
+      shot has a box at CONFIDENCE_THRESHOLD; a failing shot is never averaged
+      away by clean ones. Near misses below the threshold ask for more shots,
+      while a clean belt exits after one.
+    """
+
+    def __init__(
+        self,
+        inference: ModelInference,
+        max_shots: int = settings.MULTISHOT_MAX_SHOTS,
+        batch_size: int = settings.MULTISHOT_BATCH_SIZE,
+        margin: float = settings.MULTISHOT_DECISION_MARGIN,
+    ):
+        self.inference = inference
+        self.max_shots = max_shots
+        self.batch_size = batch_size
+        self.margin = margin
+        # Near misses must be visible to the early-exit decision
+        self.detection_conf = min(settings.CASCADE_BOX_BAND[0], settings.CONFIDENCE_THRESHOLD)
+        self.load_controller = get_load_controller()
+
+        # Metrics
+        self.packages = 0
+        self.total_shots = 0
+        self.early_exits = 0
+
+    def run(self, next_frames: FrameSource, predict_batch: Optional[BatchPredictor] = None) -> Optional[PredictionResult]:
+        """
+        Returns the fused verdict, or None if the source produced no frames.
+        `predict_batch` defaults to the model directly; callers pass a
+        scheduler-bound version to keep priorities and deadlines.
+        """
+        predict_batch = predict_batch or self.inference.predict_batch
+        predictions: List[PredictionResult] = []
+        request = 1
+        # Under overload the degradation ladder may cap the number of shots
+        max_shots = min(self.max_shots, self.load_controller.setting("max_shots", self.max_shots))
+
+        while len(predictions) < max_shots:
+            frames = next_frames(min(request, max_shots - len(predictions)))
+            if not frames:
+                break
+            try:
+                predictions.extend(predict_batch(frames, self.detection_conf))
+            except RequestShed:
+                # Out of time for more shots: decide on what we already have
+                if not predictions:
+                    raise
+                break
+            request = self.batch_size
+
+            if self._is_conclusive(predictions):
+                if len(predictions) < max_shots:
+                    self.early_exits += 1
+                break
+
+        if not predictions:
+            return None
+
+        self.packages += 1
+        self.total_shots += len(predictions)
+        return self._fuse(predictions)
+
+    @staticmethod
+    def _ok_score(prediction: PredictionResult) -> float:
+        if prediction.class_probabilities is not None:
+            return prediction.class_probabilities.get("ok", 0.0)
+        return 1.0 - max((d.confidence for d in prediction.defects), default=0.0)
+
+    def _fused_ok_score(self, predictions: List[PredictionResult]):
+        """
+        Fused 'ok' score over shots and the threshold it is compared against:
+        the mean for classifiers, the lowest shot for detectors.
+        """
+        scores = [self._ok_score(p) for p in predictions]
+        if predictions[0].class_probabilities is not None:
+            return float(np.mean(scores)), settings.OK_CONFIDENCE_THRESHOLD
+        return min(scores), 1.0 - settings.CONFIDENCE_THRESHOLD
+
+    def _is_conclusive(self, predictions: List[PredictionResult]) -> bool:
+        score, threshold = self._fused_ok_score(predictions)
+        if predictions[0].class_probabilities is None and score <= threshold:
+            # More shots can only lower a detector's fused score: the FAIL is final
+            return True
+        return abs(score - threshold) >= self.margin
+
+    def _fuse(self, predictions: List[PredictionResult]) -> PredictionResult:
+        inference_time = sum(p.inference_time for p in predictions)
+
+        if predictions[0].class_probabilities is not None:
+            fused: Dict[str, float] = {}
+            for p in predictions:
+                for name, prob in p.class_probabilities.items():
+                    fused[name] = fused.get(name, 0.0) + prob / len(predictions)
+            predicted_class = max(fused, key=fused.get)
+            return PredictionResult(
+                verdict=self.inference._classification_verdict(predicted_class, fused[predicted_class]),
+                inference_time=inference_time,
+                model_name=predictions[0].model_name,
+                predicted_class=predicted_class,
+                confidence=fused[predicted_class],
+                class_probabilities=fused,
+                shots=len(predictions),
+                **self._cascade_fields(predictions),
+            )
+
+        # Boxes of the most defective shot, without those only kept for the early-exit decision
+        worst = min(predictions, key=self._ok_score)
+        defects = [d for d in worst.defects if d.confidence >= settings.CONFIDENCE_THRESHOLD]
+        return PredictionResult(
+            verdict="FAIL" if defects else "PASS",
+            defects=defects,
+            inference_time=inference_time,
+            model_name=predictions[0].model_name,
+            shots=len(predictions),
+            **self._cascade_fields(predictions),
+        )
+
+    @staticmethod
+    def _cascade_fields(predictions: List[PredictionResult]) -> dict:
+        """In cascade mode, report the deepest stage any shot needed."""
+        if predictions[0].cascade_stage is None:
+            return {}
+        deepest = max(predictions, key=lambda p: p.cascade_stage)
+        return {"cascade_stage": deepest.cascade_stage, "decided_by": deepest.decided_by}
+
+    def stats(self) -> dict:
+        return {
+            "packages": self.packages,
+            "shots_per_package": self.total_shots / self.packages if self.packages else 0.0,
+            "early_exit_rate": self.early_exits / self.packages if self.packages else 0.0,
+        }
@@ -55,6 +55,9 @@ class NotifierService:
             "evidence_url": image_url,
             "device_id": "JETSON_01" # Hardcoded or from config? Prompt example says JETSON_01
         }
+        if result.views:
+            # Multi-camera station: one evidence entry per view
+            payload["views"] = [view.model_dump() for view in result.views]
         
         try:
             await self._send_payload(payload)
@@ -0,0 +1,187 @@
+import logging
+import time
+from collections import deque
+from typing import List, Optional, Sequence
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class PresenceDetector:
+    """
+    Cheap gate in front of ModelInference for continuous capture.
+
+    Works on a downsampled grayscale copy of each frame:
+    - a running-average background model gives ROI occupancy (how much of the
+      inspection region differs from the empty belt),
+    - frame differencing gives motion, so a slow lighting drift is not
+      mistaken for an arriving package.
+
+    While a package is in view the frame whose foreground centroid is closest
+    to the ROI centre is kept. It is returned exactly once per arrival, as soon
+    as the package starts moving away from the centre (or leaves the view),
+    so the model runs once per package instead of once per frame.
+    """
+
+    def __init__(
+        self,
+        roi: Optional[Sequence[int]] = None,
+        width: int = settings.PRESENCE_DOWNSCALE_WIDTH,
+        diff_threshold: int = settings.PRESENCE_DIFF_THRESHOLD,
+        occupancy_on: float = settings.PRESENCE_OCCUPANCY_ON,
+        occupancy_off: float = settings.PRESENCE_OCCUPANCY_OFF,
+        motion_threshold: float = settings.PRESENCE_MOTION_THRESHOLD,
+        background_alpha: float = settings.PRESENCE_BACKGROUND_ALPHA,
+        max_shots: int = 1,
+    ):
+        self.roi = roi
+        self.width = width
+        self.diff_threshold = diff_threshold
+        self.occupancy_on = occupancy_on
+        self.occupancy_off = occupancy_off
+        self.motion_threshold = motion_threshold
+        self.background_alpha = background_alpha
+        self.max_shots = max_shots
+
+        self.background: Optional[np.ndarray] = None
+        self.previous: Optional[np.ndarray] = None
+        self.scale = 1.0
+        self.roi_small = None  # (x1, y1, x2, y2) in downsampled pixels
+
+        # Per-arrival state
+        self.present = False
+        self.fired = False
+        self.best_frame: Optional[np.ndarray] = None
+        self.best_distance = float("inf")
+        self.candidates = []  # (distance, sequence, frame) of the best-centred frames so far
+        # Best-centred frames (best first) of the package that fired last, for multi-shot fusion
+        self.shots: List[np.ndarray] = []
+
+        # Metrics
+        self.frames_seen = 0
+        self.arrivals = 0
+        self.frames_fired = 0
+        self.latencies = deque(maxlen=1000)
+
+    def reset(self):
+        """Forget the background (e.g. after the camera was moved)."""
+        self.background = None
+        self.previous = None
+        self._end_arrival()
+
+    def _prepare(self, frame: np.ndarray) -> np.ndarray:
+        h, w = frame.shape[:2]
+        if self.roi_small is None or self.background is None:
+            self.scale = self.width / w if w > self.width else 1.0
+            small_w, small_h = int(round(w * self.scale)), int(round(h * self.scale))
+            x1, y1, x2, y2 = self.roi if self.roi is not None else (0, 0, w, h)
+            self.roi_small = (
+                max(0, int(x1 * self.scale)), max(0, int(y1 * self.scale)),
+                min(small_w, int(np.ceil(x2 * self.scale))), min(small_h, int(np.ceil(y2 * self.scale))),
+            )
+        else:
+            small_w = int(round(w * self.scale))
+            small_h = int(round(h * self.scale))
+
+        small = cv2.resize(frame, (small_w, small_h), interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(small, (5, 5), 0)
+
+    def update(self, frame: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Feeds one frame. Returns the best-centred frame of a package once per
+        arrival, otherwise None (the frame is gated away from the model).
+        """
+        start_time = time.perf_counter()
+        self.frames_seen += 1
+        fire = None
+
+        gray = self._prepare(frame)
+        if self.background is None:
+            self.background = gray.astype(np.float32)
+            self.previous = gray
+            self.latencies.append(time.perf_counter() - start_time)
+            return None
+
+        x1, y1, x2, y2 = self.roi_small
+        foreground_full = cv2.absdiff(gray, cv2.convertScaleAbs(self.background)) > self.diff_threshold
+        foreground = foreground_full[y1:y2, x1:x2]
+        moving = cv2.absdiff(gray, self.previous) > self.diff_threshold
+        motion = moving[y1:y2, x1:x2].mean()
+        occupancy = foreground.mean()
+        self.previous = gray
+
+        if not self.present:
+            if occupancy >= self.occupancy_on and motion >= self.motion_threshold:
+                self.present = True
+                self.arrivals += 1
+            else:
+                # Learn the empty belt at full rate, but static foreground (the
+                # leading edge of an arriving package, or a stale ghost) only
+                # very slowly, so packages are not absorbed but ghosts heal
+                belt = (~foreground_full).astype(np.uint8)
+                ghost = (foreground_full & ~moving).astype(np.uint8)
+                cv2.accumulateWeighted(gray, self.background, self.background_alpha, mask=belt)
+                cv2.accumulateWeighted(gray, self.background, self.background_alpha / 20, mask=ghost)
+
+        if self.present:
+            if occupancy < self.occupancy_off:
+                # Package left before it passed the centre: use what we have
+                if not self.fired and self.best_frame is not None:
+                    fire = self._fire()
+                self._end_arrival()
+            elif not self.fired:
+                distance = self._centre_distance(foreground)
+                if self.max_shots > 1:
+                    self.candidates.append((distance, self.frames_seen, frame))
+                    self.candidates = sorted(self.candidates, key=lambda c: c[:2])[:self.max_shots]
+                if distance <= self.best_distance:
+                    self.best_distance = distance
+                    self.best_frame = frame
+                else:
+                    # Centroid moves away from the centre: previous frame was the best one
+                    fire = self._fire()
+
+        self.latencies.append(time.perf_counter() - start_time)
+        return fire
+
+    def _fire(self) -> np.ndarray:
+        frame = self.best_frame
+        self.shots = [c[2] for c in self.candidates] or [frame]
+        self.frames_fired += 1
+        self.fired = True
+        self.best_frame = None
+        self.candidates = []
+        return frame
+
+    def _centre_distance(self, foreground: np.ndarray) -> float:
+        ys, xs = np.nonzero(foreground)
+        if len(xs) == 0:
+            return float("inf")
+        h, w = foreground.shape
+        # Normalized so the distance does not depend on ROI aspect ratio
+        return float(np.hypot(xs.mean() / w - 0.5, ys.mean() / h - 0.5))
+
+    def _end_arrival(self):
+        self.present = False
+        self.fired = False
+        self.best_frame = None
+        self.best_distance = float("inf")
+        self.candidates = []
+
+    def stats(self) -> dict:
+        latencies_ms = np.array(self.latencies) * 1000 if self.latencies else np.zeros(1)
+        return {
+            "frames_seen": self.frames_seen,
+            "arrivals": self.arrivals,
+            "frames_inferred": self.frames_fired,
+            "gating_rate": 1.0 - self.frames_fired / self.frames_seen if self.frames_seen else 0.0,
+            "package_present": self.present,
+            "latency_ms_mean": float(latencies_ms.mean()),
+            "latency_ms_p95": float(np.percentile(latencies_ms, 95)),
+        }
@@ -0,0 +1,222 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from enum import IntEnum
+from typing import Any, Callable, Dict, Optional
+
+from app.core.config import settings
+from app.services.load_controller import get_load_controller
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    """Lower value is served first."""
+    TRIGGER = 0  # hardware trigger: the pusher is waiting
+    STREAM = 1   # continuous capture (presence gate)
+    API = 2      # ad-hoc /predict calls
+
+
+class RequestShed(Exception):
+    """Raised when a request is rejected or dropped before it reaches the model."""
+
+    def __init__(self, status_code: int, reason: str):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+
+
+class _Job:
+    __slots__ = ("priority", "deadline", "seq", "fn", "args", "future")
+
+    def __init__(self, priority: Priority, deadline: float, seq: int, fn: Callable, args: tuple):
+        self.priority = priority
+        self.deadline = deadline
+        self.seq = seq
+        self.fn = fn
+        self.args = args
+        self.future: Future = Future()
+
+    def __lt__(self, other: "_Job") -> bool:
+        # Priority class first, earliest deadline within a class, then FIFO
+        return (self.priority, self.deadline, self.seq) < (other.priority, other.deadline, other.seq)
+
+
+class InferenceScheduler:
+    """
+    Single consumer in front of the model with priority classes and deadlines.
+
+    Admission control happens at submit time, so shed requests never reach
+    the model:
+    - 429 when the queue is full and nothing of lower priority can be evicted,
+    - 503 when the estimated wait plus service time already exceeds the deadline.
+    A job whose deadline passes while it is queued is dropped as expired.
+    Service time is estimated with an EWMA of recent jobs, seeded by
+    calibrate() at startup. Shed jobs never run, so they cannot correct a
+    too-high estimate: an idle scheduler always admits (the job starts right
+    away and is measured), and when nothing has completed for
+    SCHEDULER_PROBE_INTERVAL_S one job is admitted as a probe.
+    """
+
+    def __init__(self, max_queue: int = settings.SCHEDULER_MAX_QUEUE):
+        self.max_queue = max_queue
+        self.queue = []
+        self.condition = threading.Condition()
+        self.seq = itertools.count()
+        self.service_time: Optional[float] = None  # EWMA, seconds
+        self.busy_until = 0.0  # estimated end of the running job (monotonic)
+        self.last_completed = time.monotonic()
+        self.load_controller = get_load_controller()
+
+        # Metrics
+        self.submitted = {p.name: 0 for p in Priority}
+        self.completed = {p.name: 0 for p in Priority}
+        self.shed_queue_full = {p.name: 0 for p in Priority}
+        self.shed_deadline = {p.name: 0 for p in Priority}
+        self.expired = {p.name: 0 for p in Priority}
+        self.evicted = {p.name: 0 for p in Priority}
+        self.probes = 0
+
+        self.worker = threading.Thread(target=self._worker, name="inference-scheduler", daemon=True)
+        self.worker.start()
+
+    def submit(
+        self,
+        fn: Callable,
+        *args: Any,
+        priority: Priority = Priority.API,
+        deadline: Optional[float] = None,
+    ) -> Future:
+        """
+        Queues fn(*args). `deadline` is an absolute time.monotonic() value.
+        Raises RequestShed if the request is not admitted.
+        """
+        now = time.monotonic()
+        with self.condition:
+            self.submitted[priority.name] += 1
+
+            idle = not self.queue and not self.busy_until
+            if deadline is not None and self.service_time is not None and not idle:
+                # Lower-priority jobs do not delay this one, they will be served after it
+                ahead = sum(1 for job in self.queue if job.priority <= priority)
+                expected_done = max(now, self.busy_until) + (ahead + 1) * self.service_time
+                if expected_done > deadline:
+                    if now - self.last_completed > settings.SCHEDULER_PROBE_INTERVAL_S:
+                        # The estimate is stale: let one job through to re-measure it
+                        self.probes += 1
+                        self.last_completed = now
+                    else:
+                        self.shed_deadline[priority.name] += 1
+                        raise RequestShed(503, "Deadline cannot be met")
+
+            if len(self.queue) >= self.max_queue:
+                victim = max(self.queue)
+                if victim.priority <= priority:
+                    self.shed_queue_full[priority.name] += 1
+                    raise RequestShed(429, "Inference queue is full")
+                # Make room by dropping the least urgent lower-priority job
+                self.queue.remove(victim)
+                heapq.heapify(self.queue)
+                self.evicted[victim.priority.name] += 1
+                self._fail(victim, RequestShed(503, "Evicted by higher-priority work"))
+
+            job = _Job(priority, deadline if deadline is not None else float("inf"), next(self.seq), fn, args)
+            heapq.heappush(self.queue, job)
+            self.load_controller.waiting = len(self.queue)
+            self.condition.notify()
+        return job.future
+
+    def run(self, fn: Callable, *args: Any, priority: Priority = Priority.API, deadline: Optional[float] = None) -> Any:
+        """Blocking submit-and-wait, for callers already running in a worker thread."""
+        return self.submit(fn, *args, priority=priority, deadline=deadline).result()
+
+    async def run_async(self, fn: Callable, *args: Any, priority: Priority = Priority.API, deadline: Optional[float] = None) -> Any:
+        return await asyncio.wrap_future(self.submit(fn, *args, priority=priority, deadline=deadline))
+
+    def calibrate(self, fn: Callable, *args: Any, runs: int = 3):
+        """
+        Seeds the service time estimate with the median of a few direct runs of
+        fn(*args). Call at startup, after the model is warmed up and before
+        traffic arrives, so the first live job does not define the estimate.
+        """
+        timings = []
+        for _ in range(runs):
+            start_time = time.monotonic()
+            fn(*args)
+            timings.append(time.monotonic() - start_time)
+        with self.condition:
+            self.service_time = sorted(timings)[len(timings) // 2]
+            self.last_completed = time.monotonic()
+        logger.info(f"Scheduler service time calibrated at {self.service_time * 1000:.1f}ms")
+
+    @staticmethod
+    def _fail(job: _Job, error: Exception):
+        """Fails a job that will not run. Its caller may have cancelled it already."""
+        if job.future.set_running_or_notify_cancel():
+            job.future.set_exception(error)
+
+    def _worker(self):
+        while True:
+            try:
+                self._run_next()
+            except Exception as e:
+                # The worker must survive anything, or every later submit() hangs
+                logger.error(f"Inference scheduler error: {e}")
+
+    def _run_next(self):
+        """Pops and runs one job."""
+        with self.condition:
+            while not self.queue:
+                self.condition.wait()
+            job = heapq.heappop(self.queue)
+            self.load_controller.waiting = len(self.queue)
+
+            now = time.monotonic()
+            if now > job.deadline:
+                self.expired[job.priority.name] += 1
+                self._fail(job, RequestShed(503, "Deadline expired in queue"))
+                return
+            if not job.future.set_running_or_notify_cancel():
+                return  # cancelled by its caller while queued
+            self.busy_until = now + (self.service_time or 0.0)
+
+        start_time = time.monotonic()
+        try:
+            job.future.set_result(job.fn(*job.args))
+        except Exception as e:
+            job.future.set_exception(e)
+        finally:
+            elapsed = time.monotonic() - start_time
+            with self.condition:
+                self.service_time = elapsed if self.service_time is None else 0.8 * self.service_time + 0.2 * elapsed
+                self.busy_until = 0.0
+                self.last_completed = time.monotonic()
+                self.completed[job.priority.name] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self.condition:
+            return {
+                "queue_depth": len(self.queue),
+                "service_time_ms": (self.service_time or 0.0) * 1000,
+                "submitted": dict(self.submitted),
+                "completed": dict(self.completed),
+                "shed_queue_full": dict(self.shed_queue_full),
+                "shed_deadline": dict(self.shed_deadline),
+                "expired": dict(self.expired),
+                "evicted": dict(self.evicted),
+                "probes": self.probes,
+            }
+
+
+# Global instance
+scheduler = None
+
+def get_scheduler() -> InferenceScheduler:
+    global scheduler
+    if scheduler is None:
+        scheduler = InferenceScheduler()
+    return scheduler
@@ -0,0 +1,168 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.schemas.prediction import PredictionResult
+
+logger = logging.getLogger(__name__)
+
+# (camera/view name, capture time as time.monotonic(), BGR frame)
+CapturedFrame = Tuple[str, float, np.ndarray]
+
+SESSION_VERSION = 1
+
+
+class SessionRecorder:
+    """
+    Records a line session for offline replay.
+
+    Layout of a session directory:
+    - meta.json: format version, start time, relevant settings
+    - frames.raw: all frames as raw uint8 pixels, back to back (read via np.memmap)
+    - index.jsonl: one line per item with the trigger time, byte offset/shape
+      and capture time of each frame, and the live verdict and latency
+
+    Raw frames instead of a video file: replay must see exactly the pixels
+    the model saw live, and lossy re-encoding would change verdicts. All
+    times are stored relative to the session start. Writing happens on a
+    background thread; the trigger path only enqueues.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.started = time.monotonic()
+        self.items = 0
+        self.dropped = 0
+        self.queue: "queue.Queue[Optional[dict]]" = queue.Queue(maxsize=settings.RECORD_QUEUE_SIZE)
+
+        with open(self.directory / "meta.json", "w") as f:
+            json.dump({
+                "version": SESSION_VERSION,
+                "started_at": datetime.now().isoformat(),
+                "model_path": settings.MODEL_PATH,
+                "capture_mode": settings.CAPTURE_MODE,
+                "cameras": [camera.get("name") for camera in settings.CAMERAS],
+                "trigger_deadline_ms": settings.TRIGGER_DEADLINE_MS,
+            }, f, indent=2)
+
+        self.frames_file = open(self.directory / "frames.raw", "ab")
+        self.index_file = open(self.directory / "index.jsonl", "a")
+        self.writer = threading.Thread(target=self._write_loop, name="session-recorder", daemon=True)
+        self.writer.start()
+        logger.info(f"Recording session to {self.directory}")
+
+    def record(
+        self,
+        trigger_time: float,
+        frames: List[CapturedFrame],
+        result: Optional[PredictionResult] = None,
+        verdict_time: Optional[float] = None,
+        source: str = "trigger",
+    ):
+        """
+        Queues one item. Never blocks: if the writer falls behind the item is dropped.
+        `source` is "trigger" or "presence" (trigger_time is then the detection time).
+        """
+        entry = {
+            "item": self.items,
+            "source": source,
+            "trigger_time": trigger_time,
+            "frames": frames,
+            "verdict": result.verdict if result else None,
+            "latency_ms": (verdict_time - trigger_time) * 1000 if result and verdict_time else None,
+        }
+        self.items += 1
+        try:
+            self.queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+            logger.warning(f"Session recorder is behind, item {entry['item']} not recorded")
+
+    def _write_loop(self):
+        while True:
+            entry = self.queue.get()
+            if entry is None:
+                break
+            try:
+                self._write(entry)
+            except Exception as e:
+                logger.error(f"Failed to record item {entry['item']}: {e}")
+
+    def _write(self, entry: dict):
+        frames = []
+        for view, capture_time, frame in entry["frames"]:
+            frame = np.ascontiguousarray(frame, dtype=np.uint8)
+            offset = self.frames_file.tell()
+            self.frames_file.write(frame.tobytes())
+            frames.append({
+                "view": view,
+                "offset": offset,
+                "shape": list(frame.shape),
+                "capture_time": capture_time - self.started,
+            })
+        self.frames_file.flush()
+
+        line = {
+            "item": entry["item"],
+            "source": entry["source"],
+            "trigger_time": entry["trigger_time"] - self.started,
+            "frames": frames,
+            "verdict": entry["verdict"],
+            "latency_ms": entry["latency_ms"],
+        }
+        self.index_file.write(json.dumps(line) + "\n")
+        self.index_file.flush()
+
+    def close(self):
+        self.queue.put(None)
+        self.writer.join(timeout=10)
+        self.frames_file.close()
+        self.index_file.close()
+        logger.info(f"Session recorded: {self.items - self.dropped} items ({self.dropped} dropped) in {self.directory}")
+
+
+class RecordedSession:
+    """Read side of a recorded session. Frames are views into one read-only memmap."""
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        with open(self.directory / "meta.json") as f:
+            self.meta: Dict[str, Any] = json.load(f)
+        if self.meta.get("version") != SESSION_VERSION:
+            raise ValueError(f"Unsupported session format version: {self.meta.get('version')}")
+
+        with open(self.directory / "index.jsonl") as f:
+            self.items: List[dict] = [json.loads(line) for line in f if line.strip()]
+
+        frames_path = self.directory / "frames.raw"
+        self.frames = (
+            np.memmap(frames_path, dtype=np.uint8, mode="r")
+            if os.path.getsize(frames_path) else np.zeros(0, dtype=np.uint8)
+        )
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def __iter__(self) -> Iterator[dict]:
+        return iter(self.items)
+
+    def frame(self, record: dict) -> np.ndarray:
+        size = int(np.prod(record["shape"]))
+        return self.frames[record["offset"]:record["offset"] + size].reshape(record["shape"])
+
+    def item_frames(self, item: dict) -> List[Tuple[str, float, np.ndarray]]:
+        """(view, capture time relative to the trigger, frame) of one item."""
+        return [
+            (record["view"], record["capture_time"] - item["trigger_time"], self.frame(record))
+            for record in item["frames"]
+        ]
@@ -0,0 +1,240 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.schemas.prediction import PredictionResult
+from app.services.hardware_trigger import TriggerListener
+from app.services.session_recorder import RecordedSession
+
+logger = logging.getLogger(__name__)
+
+
+class _ItemReplay:
+    """Recorded frames and the timeline of the item being replayed in the current task."""
+
+    def __init__(self, item: dict, session: RecordedSession, dispatched: float, pace: bool):
+        self.views = deque(session.item_frames(item))
+        self.dispatched = dispatched
+        self.pace = pace
+        self.events: Dict[str, float] = {}
+        self.verdict: Optional[str] = None
+
+    def mark(self, event: str):
+        # First occurrence only: a burst reads several frames, the first one counts
+        self.events.setdefault(event, time.monotonic())
+
+    def wait_until(self, offset: float):
+        """Real-time mode: a frame is not available before its recorded capture time."""
+        if self.pace:
+            delay = self.dispatched + offset - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+
+# Set inside each replay task; asyncio tasks and to_thread() inherit it
+_current_item: ContextVar[Optional[_ItemReplay]] = ContextVar("replay_item", default=None)
+
+
+class ReplayCapture:
+    """Stands in for cv2.VideoCapture: serves the recorded frames of the current item, in order."""
+
+    def isOpened(self) -> bool:
+        return True
+
+    def read(self):
+        replay = _current_item.get()
+        if replay is None or not replay.views:
+            # The replayed settings want more frames than were recorded (e.g. more shots)
+            return False, None
+        _, offset, frame = replay.views.popleft()
+        replay.wait_until(offset)
+        replay.mark("capture")
+        # Cameras hand out fresh buffers; do not give the pipeline the read-only memmap
+        return True, np.array(frame)
+
+    def release(self):
+        pass
+
+
+class ReplayStation:
+    """Stands in for CameraStation: returns all recorded views of the current item."""
+
+    running = True
+
+    def capture(self, trigger_time: float):
+        replay = _current_item.get()
+        if replay is None:
+            return []
+        views = list(replay.views)
+        replay.views.clear()
+        if views:
+            replay.wait_until(max(offset for _, offset, _ in views))
+        replay.mark("capture")
+        return [(name, offset, np.array(frame)) for name, offset, frame in views]
+
+    def stop(self):
+        pass
+
+    def stats(self) -> dict:
+        return {"replay": True}
+
+
+class SessionReplayer:
+    """
+    Feeds a recorded session through the real TriggerListener pipeline:
+    trigger -> capture -> scheduler/inference -> verdict -> pusher (mock).
+
+    - Real time (`speed` > 0): triggers fire at their recorded times (scaled
+      by `speed`), overlapping items compete for the model as they did live.
+    - As fast as possible (`speed` = 0): the next trigger fires as soon as one
+      of `concurrency` items in flight has finished.
+
+    The camera is replaced by the recorded frames; everything else (scheduler,
+    load control, multi-shot, fusion, deadlines) runs with the current settings,
+    so a change can be benchmarked against real production traffic.
+    """
+
+    def __init__(self, session: RecordedSession, speed: float = 1.0, concurrency: int = 1):
+        self.session = session
+        self.speed = speed
+        self.concurrency = max(1, concurrency)
+        self.timelines: List[Dict[str, Any]] = []
+
+        self.listener = TriggerListener()
+        self.listener.is_jetson = False  # never drive real pins from a replay
+        self.listener.recorder = None
+        self.listener.verdict_store = None  # replayed verdicts must not land in the production shift log
+        self.listener.allow_mock_frames = False  # an exhausted recording ends the item, no synthetic frames
+        self.listener.publish_evidence = False  # no uploads or webhooks for replayed packages
+        multi_view = bool(session.meta.get("cameras")) or any(
+            frame["view"] != "main" for item in session for frame in item["frames"]
+        )
+        if multi_view:
+            self.listener.station = ReplayStation()
+        else:
+            self.listener.station = None
+            self.listener.cap = ReplayCapture()
+        self._instrument()
+
+    def _instrument(self):
+        """Wraps verdict and actuation of this listener instance to timestamp them."""
+        handle_result = self.listener.handle_result
+        activate_pusher = self.listener.activate_pusher
+
+        async def timed_handle_result(result: PredictionResult):
+            replay = _current_item.get()
+            if replay:
+                replay.mark("verdict")
+                replay.verdict = result.verdict
+            await handle_result(result)
+
+        async def timed_activate_pusher():
+            replay = _current_item.get()
+            if replay:
+                replay.mark("pusher")
+            await activate_pusher()
+
+        self.listener.handle_result = timed_handle_result
+        self.listener.activate_pusher = timed_activate_pusher
+
+    async def _replay_item(self, item: dict, scheduled: float):
+        dispatched = time.monotonic()
+        replay = _ItemReplay(item, self.session, dispatched, pace=self.speed > 0)
+        _current_item.set(replay)
+
+        if item.get("source") == "presence" and replay.views:
+            # Gated items re-enter where the presence gate hands them over (stream priority)
+            frames = [np.array(frame) for _, _, frame in replay.views]
+            replay.views.clear()
+            replay.mark("capture")
+            await self.listener._inspect_presence(frames[0], frames, dispatched)
+        else:
+            await self.listener.process_trigger(trigger_time=dispatched)
+        done = time.monotonic()
+
+        def since_trigger(event: str) -> Optional[float]:
+            return (replay.events[event] - dispatched) * 1000 if event in replay.events else None
+
+        verdict_ms = since_trigger("verdict")
+        self.timelines.append({
+            "item": item["item"],
+            "scheduled_ms": scheduled * 1000,
+            "dispatch_ms": (dispatched - self.started) * 1000,
+            "capture_ms": since_trigger("capture"),
+            "verdict_ms": verdict_ms,
+            "pusher_ms": since_trigger("pusher"),
+            "done_ms": (done - dispatched) * 1000,
+            "verdict": replay.verdict,
+            "recorded_verdict": item.get("verdict"),
+            "recorded_latency_ms": item.get("latency_ms"),
+            "deadline_met": verdict_ms is not None and verdict_ms <= settings.TRIGGER_DEADLINE_MS,
+        })
+
+    async def run(self) -> List[Dict[str, Any]]:
+        self.listener.loop = asyncio.get_running_loop()
+        self.listener.running = True
+        self.timelines = []
+        items = list(self.session)
+        if not items:
+            return []
+        # Model setup must not land on the first item's timeline
+        first_frame = self.session.item_frames(items[0])[0][2] if items[0]["frames"] else None
+        await asyncio.to_thread(self.listener.inference_service.warmup, first_frame.shape if first_frame is not None else (640, 640, 3))
+
+        self.started = time.monotonic()
+        first_trigger = items[0]["trigger_time"]
+
+        tasks = []
+        if self.speed > 0:
+            for item in items:
+                scheduled = (item["trigger_time"] - first_trigger) / self.speed
+                delay = self.started + scheduled - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                tasks.append(asyncio.create_task(self._replay_item(item, scheduled)))
+        else:
+            slots = asyncio.Semaphore(self.concurrency)
+
+            async def bounded(item: dict):
+                try:
+                    await self._replay_item(item, time.monotonic() - self.started)
+                finally:
+                    slots.release()
+
+            for item in items:
+                await slots.acquire()
+                tasks.append(asyncio.create_task(bounded(item)))
+
+        await asyncio.gather(*tasks)
+        self.elapsed = time.monotonic() - self.started
+        self.timelines.sort(key=lambda t: t["item"])
+        return self.timelines
+
+    def summary(self) -> Dict[str, Any]:
+        verdict_ms = [t["verdict_ms"] for t in self.timelines if t["verdict_ms"] is not None]
+        compared = [t for t in self.timelines if t["recorded_verdict"] is not None and t["verdict"] is not None]
+
+        def percentile(q: float) -> Optional[float]:
+            return float(np.percentile(verdict_ms, q)) if verdict_ms else None
+
+        return {
+            "items": len(self.timelines),
+            "elapsed_s": self.elapsed,
+            "throughput": len(self.timelines) / self.elapsed if self.elapsed else 0.0,
+            "verdict_p50_ms": percentile(50),
+            "verdict_p95_ms": percentile(95),
+            "verdict_p99_ms": percentile(99),
+            "no_verdict": sum(1 for t in self.timelines if t["verdict"] is None),
+            "deadline_missed": sum(1 for t in self.timelines if not t["deadline_met"]),
+            "pushes": sum(1 for t in self.timelines if t["pusher_ms"] is not None),
+            "verdict_agreement": (
+                sum(1 for t in compared if t["verdict"] == t["recorded_verdict"]) / len(compared)
+                if compared else None
+            ),
+        }
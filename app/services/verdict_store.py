@@ -0,0 +1,329 @@
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.schemas.prediction import PredictionResult
+
+logger = logging.getLogger(__name__)
+
+CONFIDENCE_BINS = 10  # [0, 0.1), [0.1, 0.2), ... [0.9, 1.0]
+# Latency histogram: log-spaced edges from 1ms to 10s (~10% per bin), plus underflow/overflow bins
+LATENCY_EDGES_MS = np.geomspace(1.0, 10_000.0, 97)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS verdicts (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    source TEXT NOT NULL,
+    verdict TEXT NOT NULL,
+    predicted_class TEXT,
+    confidence REAL,
+    latency_ms REAL,
+    inference_ms REAL,
+    model_name TEXT,
+    defect_classes TEXT
+);
+CREATE INDEX IF NOT EXISTS verdicts_ts ON verdicts (ts);
+CREATE TABLE IF NOT EXISTS verdict_buckets (
+    bucket_seconds INTEGER NOT NULL,
+    bucket_start INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (bucket_seconds, bucket_start)
+);
+"""
+
+COLUMNS = ["ts", "source", "verdict", "predicted_class", "confidence", "latency_ms", "inference_ms", "model_name", "defect_classes"]
+
+
+class Aggregate:
+    """Counts, confidence histogram and latency histogram of a set of verdicts. Mergeable."""
+
+    def __init__(self, data: Optional[Dict[str, Any]] = None):
+        data = data or {}
+        self.count = data.get("count", 0)
+        self.verdicts: Dict[str, int] = data.get("verdicts", {})
+        self.classes: Dict[str, int] = data.get("classes", {})
+        self.confidence = np.array(data.get("confidence", [0] * CONFIDENCE_BINS), dtype=np.int64)
+        self.latency = np.array(data.get("latency", [0] * (len(LATENCY_EDGES_MS) + 1)), dtype=np.int64)
+
+    def add(self, row: Dict[str, Any]):
+        self.count += 1
+        self.verdicts[row["verdict"]] = self.verdicts.get(row["verdict"], 0) + 1
+        classes = json.loads(row["defect_classes"]) if row["defect_classes"] else []
+        if row["predicted_class"]:
+            classes.append(row["predicted_class"])
+        for name in set(classes):
+            self.classes[name] = self.classes.get(name, 0) + 1
+        if row["confidence"] is not None:
+            self.confidence[min(int(row["confidence"] * CONFIDENCE_BINS), CONFIDENCE_BINS - 1)] += 1
+        if row["latency_ms"] is not None:
+            self.latency[np.searchsorted(LATENCY_EDGES_MS, row["latency_ms"])] += 1
+
+    def merge(self, other: "Aggregate"):
+        self.count += other.count
+        for name, n in other.verdicts.items():
+            self.verdicts[name] = self.verdicts.get(name, 0) + n
+        for name, n in other.classes.items():
+            self.classes[name] = self.classes.get(name, 0) + n
+        self.confidence += other.confidence
+        self.latency += other.latency
+
+    def latency_percentile(self, q: float) -> Optional[float]:
+        """q-th percentile from the histogram, interpolated (log-scale) inside its bin."""
+        total = int(self.latency.sum())
+        if not total:
+            return None
+        cumulative = np.cumsum(self.latency)
+        target = q / 100 * total
+        index = int(np.searchsorted(cumulative, target))
+        if index == 0:
+            return float(LATENCY_EDGES_MS[0])
+        if index >= len(LATENCY_EDGES_MS):
+            return float(LATENCY_EDGES_MS[-1])
+        lower, upper = LATENCY_EDGES_MS[index - 1], LATENCY_EDGES_MS[index]
+        fraction = (target - cumulative[index - 1]) / self.latency[index]
+        return float(lower * (upper / lower) ** fraction)
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "count": self.count,
+            "verdicts": self.verdicts,
+            "classes": self.classes,
+            "confidence": self.confidence.tolist(),
+            "latency": self.latency.tolist(),
+        })
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "verdicts": dict(self.verdicts),
+            "defect_rate": self.verdicts.get("FAIL", 0) / self.count if self.count else 0.0,
+            "classes": dict(self.classes),
+            "confidence_histogram": self.confidence.tolist(),
+            "latency_p50_ms": self.latency_percentile(50),
+            "latency_p95_ms": self.latency_percentile(95),
+            "latency_p99_ms": self.latency_percentile(99),
+        }
+
+
+class VerdictStore:
+    """
+    Append-only local log of every verdict, in SQLite (WAL mode).
+
+    `record()` only enqueues; a writer thread inserts in batches (up to
+    VERDICT_BATCH_SIZE rows or every VERDICT_FLUSH_INTERVAL_S) and, in the
+    same transaction, folds the batch into per-time-bucket aggregates
+    (counts per verdict and class, confidence and latency histograms).
+    Queries read only those bucket rows, so their cost depends on the time
+    range asked for, not on how many verdicts were logged. Aggregates live
+    in the database, so they survive restarts and are shared by pre-forked
+    workers writing to the same file.
+    """
+
+    def __init__(
+        self,
+        path: str = settings.VERDICT_DB_PATH,
+        bucket_seconds: int = settings.VERDICT_BUCKET_SECONDS,
+        batch_size: int = settings.VERDICT_BATCH_SIZE,
+        flush_interval: float = settings.VERDICT_FLUSH_INTERVAL_S,
+    ):
+        self.path = path
+        self.bucket_seconds = bucket_seconds
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+
+        self.queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(maxsize=settings.VERDICT_QUEUE_SIZE)
+        self.dropped = 0
+        self.written = 0
+
+        # Queries use their own connection; WAL lets them read while the writer commits
+        self.reader = self._connect()
+        self.reader.executescript(SCHEMA)
+        self.reader_lock = threading.Lock()
+
+        self.writer = threading.Thread(target=self._write_loop, name="verdict-store", daemon=True)
+        self.writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, check_same_thread=False, timeout=10.0)
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL: no fsync per commit; a power cut may lose the last batch, never corrupts
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def record(
+        self,
+        result: PredictionResult,
+        source: str,
+        latency_ms: Optional[float] = None,
+        timestamp: Optional[float] = None,
+    ):
+        """Queues one verdict. Never blocks the caller; drops (and counts) when the writer is behind."""
+        confidence = result.confidence
+        if confidence is None and result.defects:
+            confidence = max(d.confidence for d in result.defects)
+        defect_classes = sorted({d.class_name for d in result.defects})
+        row = {
+            "ts": timestamp if timestamp is not None else time.time(),
+            "source": source,
+            "verdict": result.verdict,
+            "predicted_class": result.predicted_class,
+            "confidence": confidence,
+            "latency_ms": latency_ms,
+            "inference_ms": result.inference_time * 1000,
+            "model_name": result.model_name,
+            "defect_classes": json.dumps(defect_classes) if defect_classes else None,
+        }
+        try:
+            self.queue.put_nowait(row)
+        except queue.Full:
+            self.dropped += 1
+
+    def _write_loop(self):
+        connection = self._connect()
+        running = True
+        while running:
+            batch: List[Dict[str, Any]] = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    row = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if row is None:
+                    running = False
+                    break
+                batch.append(row)
+            if batch:
+                try:
+                    self._write_batch(connection, batch)
+                except Exception as e:
+                    logger.error(f"Verdict store: failed to write {len(batch)} rows: {e}")
+        connection.close()
+
+    def _write_batch(self, connection: sqlite3.Connection, batch: List[Dict[str, Any]]):
+        buckets: Dict[int, Aggregate] = {}
+        for row in batch:
+            start = int(row["ts"] // self.bucket_seconds * self.bucket_seconds)
+            buckets.setdefault(start, Aggregate()).add(row)
+
+        with connection:
+            # IMMEDIATE: take the write lock up front, other workers' read-modify-write of a bucket waits
+            connection.execute("BEGIN IMMEDIATE")
+            connection.executemany(
+                f"INSERT INTO verdicts ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                [tuple(row[c] for c in COLUMNS) for row in batch],
+            )
+            for start, aggregate in buckets.items():
+                existing = connection.execute(
+                    "SELECT data FROM verdict_buckets WHERE bucket_seconds = ? AND bucket_start = ?",
+                    (self.bucket_seconds, start),
+                ).fetchone()
+                if existing:
+                    aggregate.merge(Aggregate(json.loads(existing["data"])))
+                connection.execute(
+                    "INSERT OR REPLACE INTO verdict_buckets (bucket_seconds, bucket_start, count, data) VALUES (?, ?, ?, ?)",
+                    (self.bucket_seconds, start, aggregate.count, aggregate.to_json()),
+                )
+        self.written += len(batch)
+
+    def _buckets(self, since: float, until: float) -> List[sqlite3.Row]:
+        first = int(since // self.bucket_seconds * self.bucket_seconds)
+        with self.reader_lock:
+            return self.reader.execute(
+                "SELECT bucket_start, data FROM verdict_buckets "
+                "WHERE bucket_seconds = ? AND bucket_start >= ? AND bucket_start < ? ORDER BY bucket_start",
+                (self.bucket_seconds, first, until),
+            ).fetchall()
+
+    def summary(self, minutes: float) -> Dict[str, Any]:
+        """Aggregates of the last `minutes` (whole buckets)."""
+        now = time.time()
+        total = Aggregate()
+        for row in self._buckets(now - minutes * 60, now + self.bucket_seconds):
+            total.merge(Aggregate(json.loads(row["data"])))
+        return {"minutes": minutes, "bucket_seconds": self.bucket_seconds, **total.summary()}
+
+    def series(self, minutes: float) -> List[Dict[str, Any]]:
+        """One entry per bucket of the last `minutes` that has verdicts."""
+        now = time.time()
+        series = []
+        for row in self._buckets(now - minutes * 60, now + self.bucket_seconds):
+            aggregate = Aggregate(json.loads(row["data"]))
+            series.append({
+                "bucket_start": row["bucket_start"],
+                "count": aggregate.count,
+                "fail": aggregate.verdicts.get("FAIL", 0),
+                "no_verdict": aggregate.verdicts.get("NO_VERDICT", 0),
+                "defect_rate": aggregate.verdicts.get("FAIL", 0) / aggregate.count if aggregate.count else 0.0,
+                "classes": aggregate.classes,
+                "latency_p95_ms": aggregate.latency_percentile(95),
+            })
+        return series
+
+    def export_parquet(self, output: str, since: Optional[float] = None, until: Optional[float] = None, chunk_rows: int = 100_000) -> int:
+        """Writes the raw log (optionally a [since, until) unix-time range) to Parquet. Needs pyarrow."""
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet export requires pyarrow: pip install pyarrow")
+
+        schema = pa.schema([
+            ("ts", pa.float64()), ("source", pa.string()), ("verdict", pa.string()),
+            ("predicted_class", pa.string()), ("confidence", pa.float64()), ("latency_ms", pa.float64()),
+            ("inference_ms", pa.float64()), ("model_name", pa.string()), ("defect_classes", pa.string()),
+        ])
+        connection = self._connect()
+        cursor = connection.execute(
+            f"SELECT {', '.join(COLUMNS)} FROM verdicts WHERE ts >= ? AND ts < ? ORDER BY id",
+            (since if since is not None else float("-inf"), until if until is not None else float("inf")),
+        )
+        rows_written = 0
+        with pq.ParquetWriter(output, schema) as writer:
+            while True:
+                rows = cursor.fetchmany(chunk_rows)
+                if not rows:
+                    break
+                columns = {c: [row[c] for row in rows] for c in COLUMNS}
+                writer.write_table(pa.table(columns, schema=schema))
+                rows_written += len(rows)
+        connection.close()
+        return rows_written
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "written": self.written,
+            "pending": self.queue.qsize(),
+            "dropped": self.dropped,
+        }
+
+    def close(self):
+        """Flushes pending verdicts and stops the writer."""
+        self.queue.put(None)
+        self.writer.join(timeout=10)
+        with self.reader_lock:
+            self.reader.close()
+
+
+# Global instance
+verdict_store = None
+
+def get_verdict_store() -> Optional[VerdictStore]:
+    """The shared store, or None if VERDICT_STORE_ENABLED is off."""
+    global verdict_store
+    if verdict_store is None and settings.VERDICT_STORE_ENABLED:
+        verdict_store = VerdictStore()
+    return verdict_store
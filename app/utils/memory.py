@@ -0,0 +1,45 @@
+import os
+from typing import Dict, List, Optional
+
+
+def process_memory(pid: Optional[int] = None) -> Dict[str, float]:
+    """
+    Memory of one process in MB, from /proc/<pid>/smaps_rollup (Linux).
+
+    - rss: resident pages, shared ones counted in full
+    - pss: shared pages divided by the number of processes mapping them
+    - uss: pages private to this process (what killing it would free)
+    - shared: resident pages also mapped by other processes
+    Empty dict where smaps_rollup is unavailable (non-Linux, exited process).
+    """
+    pid = pid or os.getpid()
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            lines = f.readlines()
+    except OSError:
+        return {}
+
+    kb = {}
+    for line in lines:
+        parts = line.split()
+        if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+            kb[parts[0][:-1]] = int(parts[1])
+
+    return {
+        "rss": kb.get("Rss", 0) / 1024,
+        "pss": kb.get("Pss", 0) / 1024,
+        "uss": (kb.get("Private_Clean", 0) + kb.get("Private_Dirty", 0)) / 1024,
+        "shared": (kb.get("Shared_Clean", 0) + kb.get("Shared_Dirty", 0)) / 1024,
+    }
+
+
+def child_pids(pid: int) -> List[int]:
+    """Direct children of a process (Linux)."""
+    children = []
+    try:
+        for task in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{task}/children") as f:
+                children.extend(int(c) for c in f.read().split())
+    except OSError:
+        pass
+    return children
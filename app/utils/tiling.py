@@ -0,0 +1,110 @@
+import numpy as np
+from typing import List, Optional, Sequence, Tuple
+
+Tile = Tuple[int, int, int, int]  # x1, y1, x2, y2 in frame pixels
+
+
+def _axis_starts(length: int, tile: int, stride: int) -> List[int]:
+    """
+    Start offsets along one axis. The last tile is snapped to the edge
+    so the whole axis is covered without producing a partial tile.
+    """
+    if length <= tile:
+        return [0]
+    starts = list(range(0, length - tile, stride))
+    starts.append(length - tile)
+    return starts
+
+
+def make_tiles(
+    frame_shape: Sequence[int],
+    tile_size: int,
+    overlap: float,
+    roi: Optional[Sequence[int]] = None,
+) -> List[Tile]:
+    """
+    Split a frame into overlapping square tiles.
+
+    Args:
+        frame_shape: Shape of the frame (h, w, ...).
+        tile_size: Tile side in pixels.
+        overlap: Fraction of the tile shared with its neighbour (0 <= overlap < 1).
+        roi: Optional [x1, y1, x2, y2]. Tiles that do not intersect it are skipped.
+    """
+    h, w = frame_shape[:2]
+    stride = max(1, int(tile_size * (1.0 - overlap)))
+
+    tiles = []
+    for y in _axis_starts(h, tile_size, stride):
+        for x in _axis_starts(w, tile_size, stride):
+            tile = (x, y, min(x + tile_size, w), min(y + tile_size, h))
+            if roi is not None and not _intersects(tile, roi):
+                continue
+            tiles.append(tile)
+    return tiles
+
+
+def _intersects(tile: Tile, roi: Sequence[int]) -> bool:
+    return tile[0] < roi[2] and tile[2] > roi[0] and tile[1] < roi[3] and tile[3] > roi[1]
+
+
+def merge_detections(
+    boxes: np.ndarray,
+    scores: np.ndarray,
+    classes: np.ndarray,
+    threshold: float,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Greedy per-class merge of detections coming from overlapping tiles.
+
+    Overlap is measured as intersection over the smaller box, so an object
+    cut by a tile border (small partial box inside a larger full one) is
+    still matched. Matched boxes are merged into their union and keep the
+    highest score.
+
+    Args:
+        boxes: (N, 4) xyxy boxes in frame coordinates.
+        scores: (N,) confidences.
+        classes: (N,) class ids.
+        threshold: Minimum intersection-over-smaller to merge two boxes.
+    """
+    if len(boxes) == 0:
+        return boxes, scores, classes
+
+    out_boxes, out_scores, out_classes = [], [], []
+    for cls_id in np.unique(classes):
+        idx = np.where(classes == cls_id)[0]
+        idx = idx[np.argsort(-scores[idx])]
+        cls_boxes = boxes[idx]
+        areas = (cls_boxes[:, 2] - cls_boxes[:, 0]) * (cls_boxes[:, 3] - cls_boxes[:, 1])
+        alive = np.ones(len(idx), dtype=bool)
+
+        for i in range(len(idx)):
+            if not alive[i]:
+                continue
+            # Vectorized overlap of box i against all remaining boxes
+            rest = np.where(alive)[0]
+            rest = rest[rest > i]
+            merged = cls_boxes[i].copy()
+            if len(rest):
+                ix1 = np.maximum(cls_boxes[i, 0], cls_boxes[rest, 0])
+                iy1 = np.maximum(cls_boxes[i, 1], cls_boxes[rest, 1])
+                ix2 = np.minimum(cls_boxes[i, 2], cls_boxes[rest, 2])
+                iy2 = np.minimum(cls_boxes[i, 3], cls_boxes[rest, 3])
+                inter = np.clip(ix2 - ix1, 0, None) * np.clip(iy2 - iy1, 0, None)
+                smaller = np.minimum(areas[i], areas[rest])
+                ios = inter / np.maximum(smaller, 1e-9)
+                matched = rest[ios >= threshold]
+                if len(matched):
+                    group = cls_boxes[np.concatenate(([i], matched))]
+                    merged = np.array([
+                        group[:, 0].min(), group[:, 1].min(),
+                        group[:, 2].max(), group[:, 3].max(),
+                    ])
+                    alive[matched] = False
+
+            out_boxes.append(merged)
+            out_scores.append(scores[idx[i]])
+            out_classes.append(cls_id)
+
+    return np.array(out_boxes), np.array(out_scores), np.array(out_classes)
@@ -0,0 +1,200 @@
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import cv2
+import numpy as np
+from rich.console import Console
+from rich.table import Table
+from ultralytics import YOLO
+
+# Allow running as `python scripts/benchmark_fast_path.py` from the repo root
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.schemas.prediction import PredictionResult
+from app.services.direct_inference import DirectPredictor
+from app.services.inference_service import ModelInference
+
+console = Console()
+EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp"}
+
+
+def box_iou(a, b) -> float:
+    ix = max(0.0, min(a.x2, b.x2) - max(a.x1, b.x1))
+    iy = max(0.0, min(a.y2, b.y2) - max(a.y1, b.y1))
+    inter = ix * iy
+    union = (a.x2 - a.x1) * (a.y2 - a.y1) + (b.x2 - b.x1) * (b.y2 - b.y1) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def compare(reference: PredictionResult, fast: PredictionResult, iou_threshold: float) -> Dict[str, float]:
+    """Parity figures of one image: verdict match, probability delta, box match ratio."""
+    figures = {"verdict_match": float(reference.verdict == fast.verdict)}
+    if reference.class_probabilities is not None:
+        figures["top1_match"] = float(reference.predicted_class == fast.predicted_class)
+        figures["max_prob_delta"] = max(
+            abs(p - fast.class_probabilities.get(name, 0.0))
+            for name, p in reference.class_probabilities.items()
+        )
+    else:
+        matched = sum(
+            1 for ref in reference.defects
+            if any(f.class_id == ref.class_id and box_iou(ref, f) >= iou_threshold for f in fast.defects)
+        )
+        total = max(len(reference.defects), len(fast.defects))
+        figures["box_match"] = matched / total if total else 1.0
+    return figures
+
+
+def benchmark(images_dir: str, limit: int = 0, repeats: int = 3, iou_threshold: float = 0.9,
+              max_prob_delta: float = 0.05, min_agreement: float = 0.98) -> bool:
+    """
+    Runs every image through YOLO.predict() and the direct path, checks that
+    both agree and compares latency. Returns True if parity holds.
+    """
+    images = sorted(p for p in Path(images_dir).rglob("*") if p.suffix.lower() in EXTENSIONS)
+    if limit:
+        images = images[:limit]
+    if not images:
+        console.print(f"[bold red]Error: No images found in {images_dir}[/bold red]")
+        return False
+
+    service = ModelInference()
+    modes = {
+        "ultralytics predict()": service.predict_full_frame,
+        "direct": service.predict_direct,
+    }
+    latencies: Dict[str, List[float]] = {name: [] for name in modes}
+    parity: Dict[str, List[float]] = {}
+
+    # Warmup both paths so model setup and fusion are not counted
+    warmup = cv2.imread(str(images[0]))
+    for run in modes.values():
+        run(warmup)
+
+    console.print(f"[green]Comparing {len(images)} images ({repeats} timed runs each)...[/green]")
+    for image_path in images:
+        image = cv2.imread(str(image_path))
+        if image is None:
+            continue
+
+        outputs = {}
+        for name, run in modes.items():
+            for _ in range(repeats):
+                start = time.perf_counter()
+                outputs[name] = run(image)
+                latencies[name].append(time.perf_counter() - start)
+
+        for key, value in compare(*outputs.values(), iou_threshold).items():
+            parity.setdefault(key, []).append(value)
+
+    table = Table(title="YOLO.predict() vs direct path")
+    table.add_column("Path")
+    table.add_column("Mean (ms)", justify="right")
+    table.add_column("p50 (ms)", justify="right")
+    table.add_column("p95 (ms)", justify="right")
+    for name in modes:
+        ms = np.array(latencies[name]) * 1000
+        table.add_row(name, f"{ms.mean():.2f}", f"{np.percentile(ms, 50):.2f}", f"{np.percentile(ms, 95):.2f}")
+    console.print(table)
+
+    ok = True
+    for key, values in parity.items():
+        if key == "max_prob_delta":
+            value = float(np.max(values))
+            passed = value <= max_prob_delta
+        else:
+            value = float(np.mean(values))
+            passed = value >= min_agreement
+        ok &= passed
+        status = "[green]OK[/green]" if passed else "[bold red]MISMATCH[/bold red]"
+        console.print(f"{key:>15}: {value:.4f} {status}")
+
+    speedup = np.mean(latencies["ultralytics predict()"]) / np.mean(latencies["direct"])
+    console.print(f"[bold]Direct path speedup: {speedup:.2f}x[/bold]")
+    return ok
+
+
+def synthetic_frame(shape, seed: int = 0) -> np.ndarray:
+    """Camera-like test frame: smooth background, a package with print and edges, sensor noise."""
+    h, w = shape
+    rng = np.random.default_rng(seed)
+    x = np.linspace(0, 1, w, dtype=np.float32)
+    y = np.linspace(0, 1, h, dtype=np.float32)[:, None]
+    frame = np.stack([60 + 80 * x + 0 * y, 70 + 60 * y + 0 * x, 90 + 40 * x * y], axis=-1)
+    frame = frame.astype(np.uint8)
+    cv2.rectangle(frame, (w // 4, h // 4), (3 * w // 4, 3 * h // 4), (200, 190, 170), -1)
+    cv2.putText(frame, "LOT 0423", (w // 4 + 10, h // 2), cv2.FONT_HERSHEY_SIMPLEX, max(0.5, w / 640), (20, 20, 20), max(1, w // 320))
+    noise = rng.normal(0, 3, frame.shape)
+    return np.clip(frame + noise, 0, 255).astype(np.uint8)
+
+
+def check_preprocessing(model_specs: List[str], shapes: List[Tuple[int, int]], max_delta: float, max_mean_delta: float) -> bool:
+    """
+    Compares DirectPredictor.preprocess() with the preprocessing of Ultralytics'
+    own predictor on synthetic frames, for every model and frame shape. Needs
+    neither sample images nor trained weights (model .yaml files work), so it
+    can run on any machine. Detection must match exactly (up to one grey
+    level); classification is allowed `max_delta` / `max_mean_delta` (0..1
+    scale) for the area-vs-PIL resize.
+    """
+    ok = True
+    table = Table(title="Preprocessed input: direct path vs Ultralytics")
+    for column in ["Model", "Task", "Frame", "Input", "Max delta", "Mean delta", ""]:
+        table.add_column(column, justify="right")
+
+    for spec in model_specs:
+        path, _, imgsz = spec.partition("@")
+        yolo = YOLO(path)
+        direct = DirectPredictor(yolo, int(imgsz) if imgsz else None)
+        # Builds yolo.predictor with the same image size
+        yolo.predict(source=np.zeros((64, 64, 3), dtype=np.uint8), imgsz=direct.imgsz, verbose=False)
+
+        for shape in shapes:
+            frame = synthetic_frame(shape)
+            reference = yolo.predictor.preprocess([frame]).float().cpu()
+            candidate = direct.preprocess(frame).float().cpu()
+            if reference.shape != candidate.shape:
+                passed, delta, mean_delta = False, float("nan"), float("nan")
+            else:
+                diff = (reference - candidate).abs()
+                delta, mean_delta = float(diff.max()), float(diff.mean())
+                if direct.task == "classify":
+                    passed = delta <= max_delta and mean_delta <= max_mean_delta
+                else:
+                    passed = delta <= 1 / 255 + 1e-6
+            ok &= passed
+            table.add_row(
+                Path(path).name, direct.task, f"{shape[1]}x{shape[0]}", "x".join(map(str, candidate.shape[2:])),
+                f"{delta:.4f}", f"{mean_delta:.5f}", "[green]OK[/green]" if passed else "[bold red]MISMATCH[/bold red]",
+            )
+    console.print(table)
+    return ok
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Parity and latency check of the direct inference path")
+    parser.add_argument("images", nargs="?", help="Folder with sample images")
+    parser.add_argument("--limit", type=int, default=0, help="Only use the first N images")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed runs per image and path")
+    parser.add_argument("--iou", type=float, default=0.9, help="IoU for two boxes to count as the same")
+    parser.add_argument("--max-prob-delta", type=float, default=0.05, help="Allowed class probability difference")
+    parser.add_argument("--min-agreement", type=float, default=0.98, help="Required verdict/top1/box agreement")
+
+    parser.add_argument("--preprocess-check", action="store_true", help="Only compare preprocessed input tensors on synthetic frames")
+    parser.add_argument("--models", default="yolo11n.yaml@640,yolo11n-cls.yaml@224", help="Models for --preprocess-check, as path[@imgsz]")
+    parser.add_argument("--shapes", default="1080x1920,480x640,240x320,640x640", help="Frame shapes (HxW) for --preprocess-check")
+    parser.add_argument("--max-pixel-delta", type=float, default=0.15, help="Allowed max input difference for classifiers (0..1)")
+    parser.add_argument("--max-mean-pixel-delta", type=float, default=0.005, help="Allowed mean input difference for classifiers (0..1)")
+
+    args = parser.parse_args()
+    if args.preprocess_check:
+        shapes = [tuple(int(v) for v in shape.split("x")) for shape in args.shapes.split(",")]
+        ok = check_preprocessing(args.models.split(","), shapes, args.max_pixel_delta, args.max_mean_pixel_delta)
+        sys.exit(0 if ok else 1)
+    if not args.images:
+        parser.error("images is required unless --preprocess-check is given")
+    ok = benchmark(args.images, args.limit, args.repeats, args.iou, args.max_prob_delta, args.min_agreement)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,136 @@
+
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+from rich.console import Console
+from rich.table import Table
+
+# Allow running as `python scripts/benchmark_tiling.py` from the repo root
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.services.inference_service import ModelInference
+
+console = Console()
+EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp"}
+
+
+def load_labels(image_path: Path, shape) -> Optional[np.ndarray]:
+    """
+    Reads YOLO-format labels (class cx cy w h, normalized) for an image.
+    Looks next to the image and in a sibling 'labels' folder.
+    Returns (N, 5) array of [class_id, x1, y1, x2, y2] in pixels.
+    """
+    candidates = [
+        image_path.with_suffix(".txt"),
+        image_path.parent.parent / "labels" / f"{image_path.stem}.txt",
+    ]
+    h, w = shape[:2]
+    for label_path in candidates:
+        if label_path.exists():
+            rows = np.loadtxt(label_path, ndmin=2)
+            if rows.size == 0:
+                return np.zeros((0, 5))
+            cls, cx, cy, bw, bh = rows.T
+            return np.stack([
+                cls,
+                (cx - bw / 2) * w, (cy - bh / 2) * h,
+                (cx + bw / 2) * w, (cy + bh / 2) * h,
+            ], axis=1)
+    return None
+
+
+def count_hits(gt: np.ndarray, prediction, iou_threshold: float = 0.5) -> int:
+    """Number of ground-truth boxes matched by a same-class prediction at IoU >= threshold."""
+    hits = 0
+    for cls_id, x1, y1, x2, y2 in gt:
+        for box in prediction.defects:
+            if box.class_id != int(cls_id):
+                continue
+            ix = max(0.0, min(x2, box.x2) - max(x1, box.x1))
+            iy = max(0.0, min(y2, box.y2) - max(y1, box.y1))
+            inter = ix * iy
+            union = (x2 - x1) * (y2 - y1) + (box.x2 - box.x1) * (box.y2 - box.y1) - inter
+            if union > 0 and inter / union >= iou_threshold:
+                hits += 1
+                break
+    return hits
+
+
+def benchmark(images_dir: str, limit: int = 0):
+    """
+    Runs every image through full-frame and tiled inference and compares
+    latency and (when labels are available) detection recall.
+    """
+    images = sorted(p for p in Path(images_dir).rglob("*") if p.suffix.lower() in EXTENSIONS)
+    if limit:
+        images = images[:limit]
+    if not images:
+        console.print(f"[bold red]Error: No images found in {images_dir}[/bold red]")
+        return
+
+    service = ModelInference()
+    modes = {
+        "full-frame": service.predict_full_frame,
+        "tiled": service.predict_tiled,
+    }
+    latencies: Dict[str, List[float]] = {name: [] for name in modes}
+    hits: Dict[str, int] = {name: 0 for name in modes}
+    fails: Dict[str, int] = {name: 0 for name in modes}
+    total_gt = 0
+
+    # Warmup both paths so model setup is not counted
+    warmup = cv2.imread(str(images[0]))
+    for run in modes.values():
+        run(warmup)
+
+    console.print(f"[green]Benchmarking {len(images)} images...[/green]")
+    for image_path in images:
+        image = cv2.imread(str(image_path))
+        if image is None:
+            continue
+        gt = load_labels(image_path, image.shape)
+        if gt is not None:
+            total_gt += len(gt)
+
+        for name, run in modes.items():
+            start = time.perf_counter()
+            prediction = run(image)
+            latencies[name].append(time.perf_counter() - start)
+            if prediction.verdict == "FAIL":
+                fails[name] += 1
+            if gt is not None:
+                hits[name] += count_hits(gt, prediction)
+
+    table = Table(title="Full-frame vs tiled inference")
+    table.add_column("Mode")
+    table.add_column("Mean (ms)", justify="right")
+    table.add_column("p50 (ms)", justify="right")
+    table.add_column("p95 (ms)", justify="right")
+    table.add_column("FAIL verdicts", justify="right")
+    table.add_column("Recall@0.5", justify="right")
+    for name in modes:
+        ms = np.array(latencies[name]) * 1000
+        recall = f"{hits[name] / total_gt:.3f}" if total_gt else "n/a"
+        table.add_row(
+            name,
+            f"{ms.mean():.1f}",
+            f"{np.percentile(ms, 50):.1f}",
+            f"{np.percentile(ms, 95):.1f}",
+            str(fails[name]),
+            recall,
+        )
+    console.print(table)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Compare tiled and full-frame inference")
+    parser.add_argument("images", help="Folder with images (optionally with YOLO-format labels)")
+    parser.add_argument("--limit", type=int, default=0, help="Only use the first N images")
+
+    args = parser.parse_args()
+    benchmark(args.images, args.limit)
@@ -0,0 +1,176 @@
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import httpx
+import numpy as np
+from rich.console import Console
+from rich.table import Table
+
+# Allow running as `python scripts/benchmark_workers.py` from the repo root
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from app.utils.memory import child_pids, process_memory
+
+console = Console()
+EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp"}
+
+
+def layout_command(layout: str, workers: int, port: int) -> List[str]:
+    if layout == "single":
+        return [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port)]
+    if layout == "prefork":
+        return [sys.executable, "-m", "app.server", "--workers", str(workers), "--port", str(port)]
+    if layout == "uvicorn":
+        # Baseline: every worker loads its own model copy
+        return [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--workers", str(workers)]
+    raise ValueError(f"Unknown layout: {layout}")
+
+
+def process_tree(pid: int) -> List[int]:
+    pids = [pid]
+    for child in child_pids(pid):
+        pids.extend(process_tree(child))
+    return pids
+
+
+def tree_memory(pid: int) -> Dict[str, float]:
+    """PSS of the whole process tree plus per-worker figures (processes other than the root)."""
+    pids = process_tree(pid)
+    memories = {p: process_memory(p) for p in pids}
+    memories = {p: m for p, m in memories.items() if m}
+    workers = [m for p, m in memories.items() if p != pid] or list(memories.values())
+    return {
+        "processes": len(memories),
+        "total_pss": sum(m["pss"] for m in memories.values()),
+        "worker_pss": float(np.mean([m["pss"] for m in workers])) if workers else 0.0,
+        "worker_uss": float(np.mean([m["uss"] for m in workers])) if workers else 0.0,
+    }
+
+
+async def wait_ready(url: str, timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(f"{url}/healthcheck")).status_code == 200:
+                    return True
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.5)
+    return False
+
+
+async def load(url: str, images: List[bytes], concurrency: int, duration: float) -> Dict[str, float]:
+    """`concurrency` clients post images back to back for `duration` seconds."""
+    latencies: List[float] = []
+    errors = 0
+    stop_at = time.monotonic() + duration
+
+    async def client_loop(client: httpx.AsyncClient, offset: int):
+        nonlocal errors
+        i = offset
+        while time.monotonic() < stop_at:
+            start = time.perf_counter()
+            try:
+                response = await client.post(
+                    f"{url}/api/v1/predict",
+                    files={"file": ("frame.jpg", images[i % len(images)], "image/jpeg")},
+                )
+                if response.status_code == 200:
+                    latencies.append(time.perf_counter() - start)
+                else:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            i += 1
+
+    start = time.monotonic()
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(timeout=60, limits=limits) as client:
+        await asyncio.gather(*(client_loop(client, n) for n in range(concurrency)))
+    elapsed = time.monotonic() - start
+
+    ms = np.array(latencies) * 1000 if latencies else np.zeros(1)
+    return {
+        "throughput": len(latencies) / elapsed,
+        "p50": float(np.percentile(ms, 50)),
+        "p95": float(np.percentile(ms, 95)),
+        "errors": errors,
+    }
+
+
+def benchmark(images_dir: str, layouts: List[str], workers: int, concurrency: int, duration: float, port: int, startup_timeout: float):
+    paths = sorted(p for p in Path(images_dir).rglob("*") if p.suffix.lower() in EXTENSIONS)
+    if not paths:
+        console.print(f"[bold red]Error: No images found in {images_dir}[/bold red]")
+        return
+    images = [p.read_bytes() for p in paths[:50]]
+
+    # Camera/GPIO are not part of this benchmark
+    env = {**os.environ, "TRIGGER_LISTENER_ENABLED": "false"}
+    url = f"http://127.0.0.1:{port}"
+    rows = []
+    for layout in layouts:
+        console.print(f"[green]Starting '{layout}' layout...[/green]")
+        process = subprocess.Popen(
+            layout_command(layout, workers, port), cwd=ROOT, env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            startup = time.monotonic()
+            if not asyncio.run(wait_ready(url, startup_timeout)):
+                console.print(f"[bold red]'{layout}' did not become ready in {startup_timeout:.0f}s[/bold red]")
+                continue
+            startup = time.monotonic() - startup
+            # Warmup pass so lazy initialisation is not measured
+            asyncio.run(load(url, images, concurrency, 2.0))
+            result = asyncio.run(load(url, images, concurrency, duration))
+            memory = tree_memory(process.pid)
+            rows.append((layout, startup, memory, result))
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    table = Table(title=f"Serving layouts ({workers} workers, {concurrency} concurrent clients)")
+    for column in ["Layout", "Processes", "Startup (s)", "Total PSS (MB)", "Worker PSS (MB)", "Worker USS (MB)", "req/s", "p50 (ms)", "p95 (ms)", "Errors"]:
+        table.add_column(column, justify="left" if column == "Layout" else "right")
+    for layout, startup, memory, result in rows:
+        table.add_row(
+            layout, str(memory["processes"]), f"{startup:.1f}",
+            f"{memory['total_pss']:.0f}", f"{memory['worker_pss']:.0f}", f"{memory['worker_uss']:.0f}",
+            f"{result['throughput']:.2f}", f"{result['p50']:.1f}", f"{result['p95']:.1f}", str(result["errors"]),
+        )
+    console.print(table)
+
+    baseline = next((r for r in rows if r[0] == "single"), None)
+    if baseline:
+        for layout, _, memory, result in rows:
+            if layout != "single" and baseline[3]["throughput"]:
+                console.print(
+                    f"[bold]{layout}:[/bold] {result['throughput'] / baseline[3]['throughput']:.2f}x throughput, "
+                    f"{memory['total_pss'] / baseline[2]['total_pss']:.2f}x memory of the single process"
+                )
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Memory and throughput of single-process vs pre-forked serving")
+    parser.add_argument("images", help="Folder with sample images to post")
+    parser.add_argument("--layouts", default="single,prefork", help="Comma-separated: single, prefork, uvicorn")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Workers for multi-process layouts")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent clients")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds of load per layout")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--startup-timeout", type=float, default=120.0)
+
+    args = parser.parse_args()
+    benchmark(args.images, args.layouts.split(","), args.workers, args.concurrency, args.duration, args.port, args.startup_timeout)
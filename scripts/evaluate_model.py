@@ -0,0 +1,352 @@
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+from rich.console import Console
+from rich.table import Table
+
+# Allow running as `python scripts/evaluate_model.py` from the repo root
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.core.config import settings
+from app.schemas.prediction import PredictionResult
+from scripts.prepare_data import collect_sources
+
+console = Console()
+
+THRESHOLDS = np.round(np.arange(0.05, 1.0, 0.01), 2)
+
+
+def stream_batches(sources: List[Tuple[Path, str]], batch_size: int, workers: int, prefetch: int) -> queue.Queue:
+    """
+    Decodes images on a thread pool (cv2 releases the GIL) and queues them in
+    batches of `batch_size`, in source order. At most `prefetch` batches wait
+    in the queue, so decoding runs ahead of the model without loading the
+    whole dataset into memory. The queue ends with None.
+    """
+    batches: queue.Queue = queue.Queue(maxsize=prefetch)
+
+    def produce():
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for start in range(0, len(sources), batch_size):
+                chunk = sources[start:start + batch_size]
+                images = list(pool.map(lambda source: cv2.imread(str(source[0])), chunk))
+                batch = [(path, label, image) for (path, label), image in zip(chunk, images) if image is not None]
+                if len(batch) < len(chunk):
+                    console.print(f"[yellow]Skipped {len(chunk) - len(batch)} unreadable images[/yellow]")
+                if batch:
+                    batches.put(batch)  # blocks while `prefetch` batches are waiting
+        batches.put(None)
+
+    threading.Thread(target=produce, name="eval-decoder", daemon=True).start()
+    return batches
+
+
+def class_scores(prediction: PredictionResult) -> Dict[str, float]:
+    """Score per class for the threshold sweep: probabilities, or the most confident box per class."""
+    if prediction.class_probabilities is not None:
+        return dict(prediction.class_probabilities)
+    scores: Dict[str, float] = {}
+    for defect in prediction.defects:
+        scores[defect.class_name] = max(scores.get(defect.class_name, 0.0), defect.confidence)
+    return scores
+
+
+def predicted_label(prediction: PredictionResult) -> str:
+    """Top-1 class; for detection models the most confident defect, or 'ok' if there is none."""
+    if prediction.predicted_class is not None:
+        return prediction.predicted_class
+    if prediction.defects:
+        return max(prediction.defects, key=lambda d: d.confidence).class_name
+    return "ok"
+
+
+def classification_metrics(records: List[dict], classes: List[str]) -> Tuple[Dict[str, dict], List[List[int]]]:
+    index = {name: i for i, name in enumerate(classes)}
+    matrix = np.zeros((len(classes), len(classes)), dtype=int)  # rows: truth, columns: prediction
+    for record in records:
+        matrix[index[record["label"]], index[record["predicted"]]] += 1
+
+    per_class = {}
+    for name, i in index.items():
+        tp = int(matrix[i, i])
+        predicted = int(matrix[:, i].sum())
+        support = int(matrix[i, :].sum())
+        precision = tp / predicted if predicted else None
+        recall = tp / support if support else None
+        f1 = 2 * precision * recall / (precision + recall) if precision and recall else 0.0
+        per_class[name] = {"precision": precision, "recall": recall, "f1": f1, "support": support, "predicted": predicted}
+    return per_class, matrix.tolist()
+
+
+def verdict_metrics(records: List[dict]) -> dict:
+    """PASS/FAIL as the line sees it. Truth is PASS only for images labelled 'ok'."""
+    defective = [r for r in records if r["label"] != "ok"]
+    good = [r for r in records if r["label"] == "ok"]
+    escapes = sum(1 for r in defective if r["verdict"] == "PASS")
+    false_rejects = sum(1 for r in good if r["verdict"] == "FAIL")
+    return {
+        "accuracy": sum(1 for r in records if (r["verdict"] == "PASS") == (r["label"] == "ok")) / len(records),
+        "escape_rate": escapes / len(defective) if defective else None,  # defective packages passed
+        "false_reject_rate": false_rejects / len(good) if good else None,  # good packages pushed off
+        "escapes": escapes,
+        "false_rejects": false_rejects,
+    }
+
+
+def sweep_thresholds(records: List[dict], classes: List[str], max_escape_rate: float) -> dict:
+    """
+    One-vs-rest sweep of the score of every class: the cutoff with the best F1
+    is recommended. For 'ok' the sweep replays the verdict rule instead
+    (PASS if top-1 is 'ok' and its confidence > cutoff, as in
+    ModelInference._classification_verdict): the recommendation is the lowest
+    cutoff whose escape rate stays within `max_escape_rate`, i.e. the fewest
+    false rejects at an acceptable number of escaped defects.
+    """
+    sweep = {}
+    labels = np.array([r["label"] for r in records])
+    for name in classes:
+        scores = np.array([r["scores"].get(name, 0.0) for r in records])
+        truth = labels == name
+        curve = []
+        for t in THRESHOLDS:
+            predicted = scores >= t
+            tp = int((predicted & truth).sum())
+            precision = tp / predicted.sum() if predicted.any() else None
+            recall = tp / truth.sum() if truth.any() else None
+            f1 = 2 * precision * recall / (precision + recall) if precision and recall else 0.0
+            curve.append({"threshold": float(t), "precision": precision, "recall": recall, "f1": f1})
+        best = max(curve, key=lambda point: point["f1"])
+        # Without negatives every cutoff looks perfect, so there is nothing to recommend
+        measurable = best["f1"] > 0 and not truth.all()
+        sweep[name] = {"recommended": best["threshold"] if measurable else None, "best_f1": best["f1"], "curve": curve}
+
+    if "ok" in sweep and all(r["predicted_class"] is not None for r in records):
+        if not (labels != "ok").any():
+            # Without defective samples every cutoff has a 0% escape rate; nothing to recommend
+            sweep["ok"]["recommended_ok_threshold"] = None
+            sweep["ok"]["ok_threshold_note"] = "no defective samples, escape rate cannot be measured"
+            return sweep
+        if not (labels == "ok").any():
+            sweep["ok"]["recommended_ok_threshold"] = None
+            sweep["ok"]["ok_threshold_note"] = "no 'ok' samples, false reject rate cannot be measured"
+            return sweep
+        is_ok_top1 = np.array([r["predicted_class"] == "ok" for r in records])
+        confidence = np.array([r["confidence"] or 0.0 for r in records])
+        good = labels == "ok"
+        curve = []
+        for t in THRESHOLDS:
+            passed = is_ok_top1 & (confidence > t)
+            curve.append({
+                "threshold": float(t),
+                "escape_rate": float((passed & ~good).sum() / (~good).sum()),
+                "false_reject_rate": float((~passed & good).sum() / good.sum()),
+            })
+        sweep["ok"]["verdict_curve"] = curve
+        if all(point["false_reject_rate"] == 1.0 for point in curve):
+            # Nothing passes, so the 0% escape rate of the lowest cutoff means nothing
+            sweep["ok"]["recommended_ok_threshold"] = None
+            sweep["ok"]["ok_threshold_note"] = "no sample passes at any threshold"
+            return sweep
+        acceptable = [point for point in curve if point["escape_rate"] <= max_escape_rate]
+        sweep["ok"]["recommended_ok_threshold"] = acceptable[0]["threshold"] if acceptable else None
+    return sweep
+
+
+def percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    ms = np.array(values) * 1000
+    return {f"p{q}": float(np.percentile(ms, q)) if len(ms) else None for q in (50, 90, 95, 99)}
+
+
+def evaluate(source: str, model_path: Optional[str], batch_size: int, workers: int, prefetch: int,
+             max_escape_rate: float, output: Optional[str], compare: Optional[str]) -> dict:
+    """
+    Streams a labelled folder (class folders as for prepare_data.py, a
+    prepared train/val folder, or a frames manifest) through
+    ModelInference.predict_batch, so verdicts follow exactly what the
+    service does with the current settings.
+    """
+    if model_path:
+        settings.MODEL_PATH = model_path
+    from app.services.inference_service import ModelInference
+
+    sources = collect_sources(Path(source))
+    if not sources:
+        console.print(f"[bold red]Error: No labelled images found in {source}[/bold red]")
+        return {}
+
+    service = ModelInference()
+    first = cv2.imread(str(sources[0][0]))
+    service.warmup(first.shape if first is not None else (640, 640, 3))  # model setup is not part of the numbers
+
+    console.print(f"[green]Evaluating {settings.MODEL_PATH} on {len(sources)} images (batch {batch_size}, {workers} decoders)...[/green]")
+    records = []
+    batch_latencies: List[float] = []
+    image_latencies: List[float] = []
+    waiting = 0.0
+    batches = stream_batches(sources, batch_size, workers, prefetch)
+    started = time.perf_counter()
+    while True:
+        wait_start = time.perf_counter()
+        batch = batches.get()
+        waiting += time.perf_counter() - wait_start
+        if batch is None:
+            break
+
+        batch_start = time.perf_counter()
+        predictions = service.predict_batch([image for _, _, image in batch])
+        elapsed = time.perf_counter() - batch_start
+        batch_latencies.append(elapsed)
+        image_latencies.extend([elapsed / len(batch)] * len(batch))
+
+        for (path, label, _), prediction in zip(batch, predictions):
+            records.append({
+                "path": str(path),
+                "label": label,
+                "predicted": predicted_label(prediction),
+                "predicted_class": prediction.predicted_class,
+                "confidence": prediction.confidence,
+                "verdict": prediction.verdict,
+                "scores": class_scores(prediction),
+            })
+    wall = time.perf_counter() - started
+
+    classes = sorted({r["label"] for r in records} | {r["predicted"] for r in records})
+    per_class, matrix = classification_metrics(records, classes)
+    report = {
+        "created_at": datetime.now().isoformat(),
+        "model_path": settings.MODEL_PATH,
+        "dataset": str(source),
+        "images": len(records),
+        "settings": {
+            "ok_confidence_threshold": settings.OK_CONFIDENCE_THRESHOLD,
+            "confidence_threshold": settings.CONFIDENCE_THRESHOLD,
+            "cascade_model_paths": settings.CASCADE_MODEL_PATHS,
+            "fast_path": settings.FAST_PATH_ENABLED,
+            "batch_size": batch_size,
+        },
+        "accuracy": sum(1 for r in records if r["predicted"] == r["label"]) / len(records),
+        "verdict": verdict_metrics(records),
+        "per_class": per_class,
+        "confusion_matrix": {"classes": classes, "matrix": matrix},
+        "throughput": {
+            "images_per_s": len(records) / wall,
+            "model_images_per_s": len(records) / sum(batch_latencies),
+            "decode_wait_s": waiting,  # time the model sat idle waiting for decoded images
+            "wall_s": wall,
+        },
+        "latency_ms": {"batch": percentiles(batch_latencies), "per_image": percentiles(image_latencies)},
+        "thresholds": sweep_thresholds(records, classes, max_escape_rate),
+        "errors": [
+            {"path": r["path"], "label": r["label"], "predicted": r["predicted"], "confidence": r["confidence"]}
+            for r in records if r["predicted"] != r["label"]
+        ],
+    }
+
+    print_report(report, max_escape_rate)
+    output_path = Path(output) if output else Path("reports") / f"eval_{Path(settings.MODEL_PATH).stem}_{datetime.now():%Y%m%d_%H%M%S}.json"
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, "w") as f:
+        json.dump(report, f, indent=2)
+    console.print(f"Report written to {output_path}")
+
+    if compare:
+        with open(compare) as f:
+            print_comparison(json.load(f), report)
+    return report
+
+
+def fmt(value, pattern: str = "{:.3f}") -> str:
+    return "-" if value is None else pattern.format(value)
+
+
+def print_report(report: dict, max_escape_rate: float):
+    table = Table(title=f"Per-class metrics ({report['images']} images)")
+    for column in ["Class", "Precision", "Recall", "F1", "Support", "Best cutoff"]:
+        table.add_column(column, justify="right")
+    for name, metrics in report["per_class"].items():
+        table.add_row(
+            name, fmt(metrics["precision"]), fmt(metrics["recall"]), fmt(metrics["f1"]), str(metrics["support"]),
+            fmt(report["thresholds"][name]["recommended"], "{:.2f}"),
+        )
+    console.print(table)
+
+    classes = report["confusion_matrix"]["classes"]
+    matrix = Table(title="Confusion matrix (rows: truth, columns: predicted)")
+    matrix.add_column("")
+    for name in classes:
+        matrix.add_column(name, justify="right")
+    for name, row in zip(classes, report["confusion_matrix"]["matrix"]):
+        matrix.add_row(name, *[str(v) for v in row])
+    console.print(matrix)
+
+    verdict = report["verdict"]
+    console.print(
+        f"Top-1 accuracy: [bold]{report['accuracy']:.1%}[/bold], verdict accuracy: [bold]{verdict['accuracy']:.1%}[/bold] "
+        f"(escape rate {fmt(verdict['escape_rate'], '{:.1%}')}, false reject rate {fmt(verdict['false_reject_rate'], '{:.1%}')})"
+    )
+    ok_sweep = report["thresholds"].get("ok", {})
+    if "ok_threshold_note" in ok_sweep:
+        console.print(f"[yellow]OK_CONFIDENCE_THRESHOLD: no recommendation, {ok_sweep['ok_threshold_note']}[/yellow]")
+    elif "recommended_ok_threshold" in ok_sweep:
+        console.print(
+            f"OK_CONFIDENCE_THRESHOLD: current {report['settings']['ok_confidence_threshold']}, "
+            f"recommended {fmt(ok_sweep['recommended_ok_threshold'], '{:.2f}')} (escape rate <= {max_escape_rate:.1%})"
+        )
+
+    throughput = report["throughput"]
+    latency = report["latency_ms"]
+    console.print(
+        f"Throughput: [bold]{throughput['images_per_s']:.1f} images/s[/bold] "
+        f"(model only {throughput['model_images_per_s']:.1f}, waited {throughput['decode_wait_s']:.2f}s for decoding)"
+    )
+    console.print(
+        f"Batch latency: p50 {fmt(latency['batch']['p50'], '{:.1f}ms')}, p95 {fmt(latency['batch']['p95'], '{:.1f}ms')}, "
+        f"p99 {fmt(latency['batch']['p99'], '{:.1f}ms')}"
+    )
+
+
+def print_comparison(baseline: dict, report: dict):
+    """Side by side headline numbers of a previous report and this one."""
+    table = Table(title=f"{Path(baseline['model_path']).name} -> {Path(report['model_path']).name}")
+    for column in ["Metric", "Baseline", "Current", "Delta"]:
+        table.add_column(column, justify="right")
+    rows = [
+        ("Top-1 accuracy", baseline["accuracy"], report["accuracy"]),
+        ("Verdict accuracy", baseline["verdict"]["accuracy"], report["verdict"]["accuracy"]),
+        ("Escape rate", baseline["verdict"]["escape_rate"], report["verdict"]["escape_rate"]),
+        ("False reject rate", baseline["verdict"]["false_reject_rate"], report["verdict"]["false_reject_rate"]),
+        ("Images/s", baseline["throughput"]["images_per_s"], report["throughput"]["images_per_s"]),
+        ("Batch p95 (ms)", baseline["latency_ms"]["batch"]["p95"], report["latency_ms"]["batch"]["p95"]),
+    ]
+    for name in sorted(set(baseline["per_class"]) & set(report["per_class"])):
+        rows.append((f"{name} F1", baseline["per_class"][name]["f1"], report["per_class"][name]["f1"]))
+    for name, old, new in rows:
+        delta = new - old if old is not None and new is not None else None
+        table.add_row(name, fmt(old), fmt(new), fmt(delta, "{:+.3f}"))
+    console.print(table)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Accuracy, confusion matrix and throughput of a model with the service's verdict logic")
+    parser.add_argument("source", help="Labelled images: class folders (e.g. datasets/gfb-food-cls/val) or a frames_manifest.jsonl")
+    parser.add_argument("--model", default=None, help="Model to evaluate (default: MODEL_PATH)")
+    parser.add_argument("--batch", type=int, default=16, help="Images per predict_batch() call")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="Decoding threads")
+    parser.add_argument("--prefetch", type=int, default=4, help="Decoded batches queued ahead of the model")
+    parser.add_argument("--max-escape-rate", type=float, default=0.01, help="Allowed share of defective packages passed, for the OK cutoff")
+    parser.add_argument("--output", default=None, help="JSON report path (default: reports/eval_<model>_<time>.json)")
+    parser.add_argument("--compare", default=None, help="Previous JSON report to compare against")
+
+    args = parser.parse_args()
+    evaluate(args.source, args.model, args.batch, args.workers, args.prefetch, args.max_escape_rate, args.output, args.compare)
@@ -0,0 +1,44 @@
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from rich.console import Console
+
+# Allow running as `python scripts/export_verdicts.py` from the repo root
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.core.config import settings
+from app.services.verdict_store import VerdictStore
+
+console = Console()
+
+
+def parse_time(value: str):
+    return datetime.fromisoformat(value).timestamp() if value else None
+
+
+def export(output: str, db_path: str, since: str, until: str):
+    if not Path(db_path).exists():
+        console.print(f"[bold red]Error: Verdict store {db_path} not found[/bold red]")
+        return
+    store = VerdictStore(path=db_path)
+    try:
+        rows = store.export_parquet(output, parse_time(since), parse_time(until))
+    except RuntimeError as e:
+        console.print(f"[bold red]Error: {e}[/bold red]")
+        return
+    finally:
+        store.close()
+    console.print(f"[green]Exported {rows} verdicts to {output}[/green]")
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Export the local verdict log to Parquet (requires pyarrow)")
+    parser.add_argument("output", help="Output .parquet file")
+    parser.add_argument("--db", default=settings.VERDICT_DB_PATH, help="Verdict store database")
+    parser.add_argument("--since", default="", help="ISO time, e.g. 2025-01-01T06:00")
+    parser.add_argument("--until", default="", help="ISO time (exclusive)")
+
+    args = parser.parse_args()
+    export(args.output, args.db, args.since, args.until)
@@ -2,7 +2,15 @@ import os
 import shutil
 import random
 import argparse
+import hashlib
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
 
 # Mapping from source names (Russian) to target YOLO classes (English)
 CLASS_MAPPING = {
@@ -17,6 +25,10 @@ CLASS_MAPPING = {
     "foreign_object": "foreign_object"
 }
 
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp'}
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
 def prepare_data(source_dir: str, output_dir: str, split_ratio: float = 0.8):
     source_path = Path(source_dir)
     output_path = Path(output_dir)
@@ -56,7 +68,7 @@ def prepare_data(source_dir: str, output_dir: str, split_ratio: float = 0.8):
         (val_dir / target_class).mkdir(exist_ok=True)
         
         # Get all images
-        images = [f for f in class_folder.iterdir() if f.suffix.lower() in ['.jpg', '.jpeg', '.png', '.bmp']]
+        images = [f for f in class_folder.iterdir() if f.suffix.lower() in IMAGE_EXTENSIONS]
         random.shuffle(images)
         
         split_idx = int(len(images) * split_ratio)
@@ -74,11 +86,310 @@ def prepare_data(source_dir: str, output_dir: str, split_ratio: float = 0.8):
 
     print("Data preparation complete.")
 
+
+# --- Incremental mode -------------------------------------------------------
+# Hashing and linking run on a thread pool: file reads, hashlib and OpenCV's
+# JPEG decode release the GIL, so threads scale without pickling overhead.
+
+def file_hashes(path: Path) -> Tuple[str, Optional[int]]:
+    """sha256 of the file content and 64-bit dHash of the image (None if undecodable)."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+
+    # Decoding at 1/8 scale is enough for a 9x8 difference hash and much faster
+    image = cv2.imread(str(path), cv2.IMREAD_REDUCED_GRAYSCALE_8)
+    if image is None:
+        return digest.hexdigest(), None
+    small = cv2.resize(image, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return digest.hexdigest(), int(np.packbits(bits).view(">u8")[0])
+
+
+def split_for(sha256: str, split_ratio: float) -> str:
+    """Deterministic split: the same content always lands in the same split."""
+    return "train" if int(sha256[:8], 16) / 0xFFFFFFFF < split_ratio else "val"
+
+
+def link_file(src: Path, dst: Path, method: str = "auto") -> str:
+    """
+    Places src at dst without duplicating data where possible.
+    auto: hardlink, then reflink (copy-on-write clone, e.g. btrfs/XFS), then copy.
+    Returns the method that worked.
+    """
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    if dst.exists() or dst.is_symlink():
+        dst.unlink()
+
+    if method in ("auto", "hardlink"):
+        try:
+            os.link(src, dst)
+            return "hardlink"
+        except OSError:
+            if method == "hardlink":
+                raise
+    if method in ("auto", "reflink"):
+        try:
+            import fcntl
+            FICLONE = 0x40049409
+            with open(src, "rb") as s, open(dst, "wb") as d:
+                fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+            shutil.copystat(src, dst)
+            return "reflink"
+        except (OSError, ImportError):
+            if dst.exists():
+                dst.unlink()
+            if method == "reflink":
+                raise
+    shutil.copy2(src, dst)
+    return "copy"
+
+
+class PerceptualIndex:
+    """
+    Near-duplicate lookup for 64-bit dHashes within a Hamming distance.
+    The hash is cut into max_distance + 1 chunks: two hashes that differ in at
+    most max_distance bits share at least one identical chunk, so only entries
+    sharing a chunk are compared (no all-pairs scan).
+    """
+
+    def __init__(self, max_distance: int):
+        self.max_distance = max_distance
+        chunks = max_distance + 1
+        self.bounds = [(i * 64 // chunks, (i + 1) * 64 // chunks) for i in range(chunks)]
+        self.tables: List[Dict[int, List[Tuple[int, str]]]] = [{} for _ in self.bounds]
+
+    def _chunks(self, value: int):
+        for i, (start, end) in enumerate(self.bounds):
+            yield i, (value >> start) & ((1 << (end - start)) - 1)
+
+    def find(self, value: int) -> Optional[str]:
+        for i, chunk in self._chunks(value):
+            for other, key in self.tables[i].get(chunk, []):
+                if bin(value ^ other).count("1") <= self.max_distance:
+                    return key
+        return None
+
+    def add(self, value: int, key: str):
+        for i, chunk in self._chunks(value):
+            self.tables[i].setdefault(chunk, []).append((value, key))
+
+
+def collect_manifest_sources(manifest_path: Path) -> List[Tuple[Path, str]]:
+    """(image, target class) for every labelled frame of a slice_video.py --smart manifest."""
+    sources = []
+    unlabeled = 0
+    with open(manifest_path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if not record.get("path"):
+                continue  # a video that yielded no frames
+            target_class = CLASS_MAPPING.get(record.get("class") or "")
+            if not target_class:
+                unlabeled += 1
+                continue
+            path = Path(record["path"])
+            if not path.is_absolute():
+                path = manifest_path.parent / path
+            if path.exists():
+                sources.append((path, target_class))
+    if unlabeled:
+        print(f"Skipping {unlabeled} frames without a known class in {manifest_path.name}")
+    return sorted(sources)
+
+
+def collect_sources(source_path: Path) -> List[Tuple[Path, str]]:
+    """(image, target class) for every image in known class folders, or listed in a frames manifest."""
+    if source_path.is_file():
+        return collect_manifest_sources(source_path)
+    sources = []
+    for class_folder in sorted(source_path.iterdir()):
+        if not class_folder.is_dir():
+            continue
+        target_class = CLASS_MAPPING.get(class_folder.name)
+        if not target_class:
+            print(f"Skipping unknown class folder: {class_folder.name}")
+            continue
+        sources.extend(
+            (f, target_class) for f in sorted(class_folder.iterdir())
+            if f.suffix.lower() in IMAGE_EXTENSIONS
+        )
+    return sources
+
+
+def load_manifest(path: Path) -> dict:
+    if path.exists():
+        with open(path) as f:
+            manifest = json.load(f)
+        if manifest.get("version") == MANIFEST_VERSION:
+            return manifest
+        print("Manifest format changed, rebuilding.")
+    return {"version": MANIFEST_VERSION, "files": {}}
+
+
+def save_manifest(path: Path, manifest: dict):
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, path)  # never leave a half-written manifest behind
+
+
+def prepare_data_incremental(source_dir: str, output_dir: str, split_ratio: float = 0.8,
+                             workers: int = 8, link: str = "auto", dedup_distance: int = 4):
+    """
+    Incremental variant of prepare_data:
+    - manifest.json in the output remembers size/mtime/hashes of every source
+      file, so re-runs only hash new or changed files and only touch outputs
+      whose content, class or split changed; outputs of deleted sources are removed
+    - exact duplicates (same sha256) and perceptual duplicates of the same
+      class (dHash within dedup_distance bits, -1 to disable) are kept once;
+      identical images with different classes are reported and left out
+    - split is derived from the content hash, not from a shuffle
+    - outputs are hardlinks/reflinks where the filesystem allows it
+    """
+    source_path = Path(source_dir)
+    output_path = Path(output_dir)
+    if not source_path.exists():
+        print(f"Error: Source directory '{source_dir}' does not exist.")
+        return
+
+    output_path.mkdir(parents=True, exist_ok=True)
+    manifest_path = output_path / MANIFEST_NAME
+    manifest = load_manifest(manifest_path)
+    previous: Dict[str, dict] = manifest["files"]
+    start_time = time.time()
+
+    sources = collect_sources(source_path)
+    print(f"Found {len(sources)} images in {source_path}")
+
+    # 1. Hash only what is new or changed since the last run
+    entries: Dict[str, dict] = {}
+    to_hash = []
+    for path, target_class in sources:
+        key = str(path.resolve())
+        stat = path.stat()
+        old = previous.get(key)
+        if old and old["size"] == stat.st_size and old["mtime_ns"] == stat.st_mtime_ns:
+            entries[key] = {**old, "class": target_class}
+        else:
+            entries[key] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "class": target_class}
+            to_hash.append(key)
+
+    print(f"Hashing {len(to_hash)} new or changed files ({len(sources) - len(to_hash)} unchanged)...")
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for key, (sha256, dhash) in zip(to_hash, pool.map(lambda k: file_hashes(Path(k)), to_hash)):
+            entries[key]["sha256"] = sha256
+            entries[key]["dhash"] = dhash
+
+    # 2. Deduplicate in a fixed order so the same file is kept on every run.
+    # Near-duplicates are only looked up within a class: a small defect (smudged
+    # label, foreign object) barely changes a 9x8 dHash, and the defect example
+    # must not be dropped as a copy of the 'ok' frame next to it.
+
+    # The same image under different classes: no copy is kept, the label has to be fixed at the source
+    classes_by_sha: Dict[str, set] = {}
+    for entry in entries.values():
+        classes_by_sha.setdefault(entry["sha256"], set()).add(entry["class"])
+    conflicts: Dict[str, List[str]] = {}  # sha256 -> every file with that content
+    for key in sorted(entries):
+        if len(classes_by_sha[entries[key]["sha256"]]) > 1:
+            conflicts.setdefault(entries[key]["sha256"], []).append(key)
+
+    by_sha: Dict[str, str] = {}
+    perceptual: Dict[str, PerceptualIndex] = {}
+    exact_dups = near_dups = 0
+    for key in sorted(entries):
+        entry = entries[key]
+        entry.pop("duplicate_of", None)
+        entry.pop("label_conflict", None)
+        if entry["sha256"] in conflicts:
+            entry["label_conflict"] = True
+            continue
+
+        original = by_sha.get(entry["sha256"])
+        if original is not None:
+            exact_dups += 1
+        elif dedup_distance >= 0 and entry["dhash"] is not None:
+            index = perceptual.get(entry["class"])
+            original = index.find(entry["dhash"]) if index else None
+            if original is not None:
+                near_dups += 1
+
+        if original is not None:
+            entry["duplicate_of"] = original
+            continue
+
+        by_sha[entry["sha256"]] = key
+        if dedup_distance >= 0 and entry["dhash"] is not None:
+            perceptual.setdefault(entry["class"], PerceptualIndex(dedup_distance)).add(entry["dhash"], key)
+
+    # 3. Decide where each kept file goes; collisions of equal names get the hash appended
+    wanted: Dict[str, str] = {}  # output path (relative) -> source key
+    for key in sorted(entries):
+        entry = entries[key]
+        if "duplicate_of" in entry or entry.get("label_conflict"):
+            entry.pop("output", None)
+            continue
+        entry["split"] = split_for(entry["sha256"], split_ratio)
+        name = Path(key).name
+        relative = f"{entry['split']}/{entry['class']}/{name}"
+        if relative in wanted:
+            relative = f"{entry['split']}/{entry['class']}/{Path(name).stem}_{entry['sha256'][:8]}{Path(name).suffix}"
+        wanted[relative] = key
+        entry["output"] = relative
+
+    # 4. Remove outputs that are no longer wanted (deleted sources, duplicates, moved splits)
+    stale = {old["output"] for old in previous.values() if old.get("output")} - set(wanted)
+    for relative in stale:
+        (output_path / relative).unlink(missing_ok=True)
+
+    # 5. Link only what changed
+    jobs = []
+    for relative, key in wanted.items():
+        entry = entries[key]
+        old = previous.get(key)
+        unchanged = (
+            old is not None and old.get("output") == relative
+            and old.get("sha256") == entry["sha256"] and (output_path / relative).exists()
+        )
+        if not unchanged:
+            jobs.append((Path(key), output_path / relative))
+
+    methods: Dict[str, int] = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for method in pool.map(lambda job: link_file(job[0], job[1], link), jobs):
+            methods[method] = methods.get(method, 0) + 1
+
+    manifest["files"] = entries
+    manifest["split_ratio"] = split_ratio
+    save_manifest(manifest_path, manifest)
+
+    kept = len(wanted)
+    train = sum(1 for relative in wanted if relative.startswith("train/"))
+    print(f"  - Kept {kept} images: {train} train, {kept - train} val")
+    print(f"  - Removed duplicates: {exact_dups} exact, {near_dups} perceptual (within a class)")
+    if conflicts:
+        print(f"  - Excluded {len(conflicts)} images labelled with conflicting classes, fix these sources:")
+        for keys in conflicts.values():
+            print("      " + ", ".join(f"{key} ({entries[key]['class']})" for key in keys))
+    print(f"  - Placed {len(jobs)} files {methods or ''}, removed {len(stale)} stale outputs")
+    print(f"Data preparation complete in {time.time() - start_time:.1f}s.")
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Prepare dataset for YOLO classification")
-    parser.add_argument("--source", type=str, required=True, help="Path to raw dataset with class folders")
+    parser.add_argument("--source", type=str, required=True, help="Path to raw dataset with class folders (incremental mode: or a frames_manifest.jsonl)")
     parser.add_argument("--output", type=str, default="datasets/gfb-food-cls", help="Output path for YOLO dataset")
     parser.add_argument("--split", type=float, default=0.8, help="Train split ratio (default: 0.8)")
+    parser.add_argument("--incremental", action="store_true", help="Parallel, deduplicating, manifest-based mode with hash splits and hardlinks")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="Threads for hashing and linking (incremental mode)")
+    parser.add_argument("--link", choices=["auto", "hardlink", "reflink", "copy"], default="auto", help="How outputs are created (incremental mode)")
+    parser.add_argument("--dedup-distance", type=int, default=4, help="Max dHash bit distance for near-duplicates, -1 disables (incremental mode)")
     
     args = parser.parse_args()
-    prepare_data(args.source, args.output, args.split)
+    if args.incremental:
+        prepare_data_incremental(args.source, args.output, args.split, args.workers, args.link, args.dedup_distance)
+    else:
+        prepare_data(args.source, args.output, args.split)
@@ -0,0 +1,78 @@
+import asyncio
+import json
+import logging
+import sys
+from pathlib import Path
+
+from rich.console import Console
+from rich.table import Table
+
+# Allow running as `python scripts/replay_session.py` from the repo root
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.core.config import settings
+from app.services.session_recorder import RecordedSession
+from app.services.session_replay import SessionReplayer
+
+console = Console()
+
+
+def fmt(value, suffix: str = "") -> str:
+    return "-" if value is None else f"{value:.1f}{suffix}"
+
+
+def replay(session_dir: str, speed: float, concurrency: int, output: str, show: int):
+    session = RecordedSession(session_dir)
+    if not len(session):
+        console.print(f"[bold red]Error: Session {session_dir} has no items[/bold red]")
+        return
+
+    mode = f"real time x{speed:g}" if speed > 0 else f"as fast as possible, {concurrency} in flight"
+    console.print(f"[green]Replaying {len(session)} items from {session_dir} ({mode})...[/green]")
+    replayer = SessionReplayer(session, speed=speed, concurrency=concurrency)
+    timelines = asyncio.run(replayer.run())
+
+    output_path = Path(output) if output else Path(session_dir) / "replay_timeline.jsonl"
+    with open(output_path, "w") as f:
+        for timeline in timelines:
+            f.write(json.dumps(timeline) + "\n")
+
+    table = Table(title=f"Per-item timeline (ms after trigger, first {show})")
+    for column in ["Item", "Capture", "Verdict", "Pusher", "Done", "Verdict", "Recorded", "Deadline"]:
+        table.add_column(column, justify="right")
+    for t in timelines[:show]:
+        table.add_row(
+            str(t["item"]), fmt(t["capture_ms"]), fmt(t["verdict_ms"]), fmt(t["pusher_ms"]), fmt(t["done_ms"]),
+            t["verdict"] or "-", t["recorded_verdict"] or "-",
+            "[green]met[/green]" if t["deadline_met"] else "[red]missed[/red]",
+        )
+    console.print(table)
+
+    summary = replayer.summary()
+    console.print(f"Items: {summary['items']} in {summary['elapsed_s']:.1f}s -> [bold]{summary['throughput']:.2f} items/s[/bold]")
+    console.print(
+        f"Trigger -> verdict: p50 {fmt(summary['verdict_p50_ms'], 'ms')}, "
+        f"p95 {fmt(summary['verdict_p95_ms'], 'ms')}, p99 {fmt(summary['verdict_p99_ms'], 'ms')}"
+    )
+    console.print(
+        f"Deadline ({settings.TRIGGER_DEADLINE_MS}ms) missed: {summary['deadline_missed']}, "
+        f"no verdict: {summary['no_verdict']}, pusher fired: {summary['pushes']}"
+    )
+    if summary["verdict_agreement"] is not None:
+        console.print(f"Verdict agreement with the recording: {summary['verdict_agreement']:.1%}")
+    console.print(f"Timelines written to {output_path}")
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Replay a recorded line session through the trigger pipeline")
+    parser.add_argument("session", help="Session directory (RECORD_SESSION_DIR/<start time>)")
+    parser.add_argument("--speed", type=float, default=1.0, help="Real-time factor; 0 = as fast as possible")
+    parser.add_argument("--concurrency", type=int, default=1, help="Items in flight when --speed 0")
+    parser.add_argument("--output", default="", help="Timeline JSONL path (default: <session>/replay_timeline.jsonl)")
+    parser.add_argument("--show", type=int, default=20, help="Timeline rows to print")
+    parser.add_argument("--verbose", action="store_true", help="Show pipeline logs")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+    replay(args.session, args.speed, args.concurrency, args.output, args.show)
@@ -1,11 +1,22 @@
-
 import cv2
+import json
+import os
+import queue
 import sys
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
 from rich.console import Console
 
 console = Console()
 
+VIDEO_EXTENSIONS = {".mp4", ".avi", ".mov", ".mkv", ".m4v"}
+MANIFEST_NAME = "frames_manifest.jsonl"
+
 def slice_video(video_path: str, output_dir: str, interval: int = 1):
     """
     Slices a video into frames at a specified interval.
@@ -52,12 +63,271 @@ def slice_video(video_path: str, output_dir: str, interval: int = 1):
     cap.release()
     console.print(f"\n[bold green]Done! Saved {saved_count} frames to {output_dir}[/bold green]")
 
+# --- Smart extraction mode --------------------------------------------------
+# Many videos in a process pool; inside each process the decode loop selects
+# frames by content and hands them to a writer thread, so JPEG encoding and
+# disk writes overlap with decoding.
+
+def sharpness(gray: np.ndarray) -> float:
+    """Variance of the Laplacian: low for blurred (motion, focus) frames."""
+    return float(cv2.Laplacian(gray, cv2.CV_64F).var())
+
+
+class FrameWriter:
+    """Background JPEG writer fed through a bounded queue."""
+
+    def __init__(self, quality: int = 95, max_pending: int = 32):
+        self.quality = quality
+        self.queue: "queue.Queue" = queue.Queue(maxsize=max_pending)
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            job = self.queue.get()
+            if job is None:
+                break
+            path, frame = job
+            cv2.imwrite(str(path), frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+
+    def write(self, path: Path, frame: np.ndarray):
+        self.queue.put((path, frame))  # blocks only if encoding falls far behind decoding
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+
+
+class SceneSelector:
+    """
+    Keeps one frame per distinct scene: a new segment starts when the frame
+    differs from the segment's first frame by more than `scene_threshold`
+    (mean absolute gray difference on a 64x36 thumbnail) or after
+    `max_segment` frames. Each segment contributes its sharpest frame,
+    if that frame is sharp enough.
+    """
+
+    def __init__(self, scene_threshold: float, min_sharpness: float, max_segment: int):
+        self.scene_threshold = scene_threshold
+        self.min_sharpness = min_sharpness
+        self.max_segment = max_segment
+        self.reference: Optional[np.ndarray] = None
+        self.length = 0
+        self.length_total = 0
+        self.segment_score: Optional[float] = None  # difference that opened the current segment
+        self.best = None  # (sharpness, index, frame, scene score)
+
+    def update(self, index: int, frame: np.ndarray, gray: np.ndarray) -> Optional[tuple]:
+        thumb = cv2.resize(gray, (64, 36), interpolation=cv2.INTER_AREA).astype(np.int16)
+        score = float(np.abs(thumb - self.reference).mean()) if self.reference is not None else float("inf")
+        emitted = None
+        if score > self.scene_threshold or self.length >= self.max_segment:
+            emitted = self.flush()
+            self.reference = thumb
+            self.length = 0
+            self.segment_score = score if self.length_total else None  # the first segment has no cut
+        self.length += 1
+        self.length_total += 1
+
+        value = sharpness(gray)
+        if self.best is None or value > self.best[0]:
+            self.best = (value, index, frame, self.segment_score)
+        return emitted
+
+    def flush(self) -> Optional[tuple]:
+        best, self.best = self.best, None
+        if best is not None and best[0] >= self.min_sharpness:
+            return best
+        return None
+
+
+def extract_video(video_path: str, output_dir: str, options: Dict) -> List[Dict]:
+    """Runs in a worker process. Returns the manifest records of the frames written."""
+    video = Path(video_path)
+    label = options.get("label") or (video.parent.name if options.get("label_from_dir") else None)
+    target_dir = Path(output_dir) / (label or "unlabeled")
+    target_dir.mkdir(parents=True, exist_ok=True)
+
+    cap = cv2.VideoCapture(str(video))
+    if not cap.isOpened():
+        return []
+    fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+    stride = max(1, options["stride"])
+    stat = video.stat()
+
+    presence = None
+    recent = deque(maxlen=64)  # (frame, index) to find frame indices of presence shots
+    if options.get("roi"):
+        # Same gate as the live service: one package = one arrival
+        sys.path.append(str(Path(__file__).resolve().parents[1]))
+        from app.services.presence_detector import PresenceDetector
+        presence = PresenceDetector(roi=options["roi"], max_shots=options["shots_per_package"])
+    selector = SceneSelector(options["scene_threshold"], options["min_sharpness"], int(options["max_segment_s"] * fps))
+
+    writer = FrameWriter(options["quality"])
+    records = []
+
+    def emit(index: int, frame: np.ndarray, value: float, score: Optional[float]):
+        path = target_dir / f"{video.stem}_frame_{index}.jpg"
+        writer.write(path, frame)
+        records.append({
+            "path": str(path.resolve()),
+            "class": label,
+            "video": str(video.resolve()),
+            "video_size": stat.st_size,
+            "video_mtime_ns": stat.st_mtime_ns,
+            "frame": index,
+            "timestamp_s": index / fps,
+            "sharpness": value,
+            "scene_score": score,
+        })
+
+    def gray_of(frame: np.ndarray) -> np.ndarray:
+        h, w = frame.shape[:2]
+        scale = min(1.0, 640 / w)
+        small = cv2.resize(frame, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA) if scale < 1.0 else frame
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+    index = -1
+    while True:
+        # grab() skips frames between strides without converting them
+        for _ in range(stride - 1):
+            if not cap.grab():
+                break
+            index += 1
+        ret, frame = cap.read()
+        if not ret:
+            break
+        index += 1
+
+        if presence is not None:
+            recent.append((frame, index))
+            if presence.update(frame) is not None:
+                # Sharpest of the best-centred frames of this package
+                shots = [(sharpness(gray_of(f)), f) for f in presence.shots]
+                value, best = max(shots, key=lambda s: s[0])
+                if value >= options["min_sharpness"]:
+                    best_index = next((i for f, i in recent if f is best), index)
+                    emit(best_index, best, value, None)
+        else:
+            selected = selector.update(index, frame, gray_of(frame))
+            if selected:
+                value, selected_index, selected_frame, score = selected
+                emit(selected_index, selected_frame, value, score)
+
+    if presence is None:
+        selected = selector.flush()
+        if selected:
+            value, selected_index, selected_frame, score = selected
+            emit(selected_index, selected_frame, value, score)
+
+    cap.release()
+    writer.close()
+    return records
+
+
+def find_videos(inputs: List[str]) -> List[Path]:
+    videos = []
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            videos.extend(sorted(p for p in path.rglob("*") if p.suffix.lower() in VIDEO_EXTENSIONS))
+        elif path.exists():
+            videos.append(path)
+        else:
+            console.print(f"[yellow]Skipping missing input {path}[/yellow]")
+    return videos
+
+
+def slice_videos_smart(inputs: List[str], output_dir: str, options: Dict, workers: int):
+    """
+    Content-based extraction over many videos. Writes/updates
+    <output>/frames_manifest.jsonl (one record per frame, usable as
+    `prepare_data.py --incremental --source <manifest>`). Videos whose size
+    and mtime did not change since the last run are skipped; a video that
+    yielded no frames keeps one record with "path": null for that purpose.
+    """
+    output = Path(output_dir)
+    output.mkdir(parents=True, exist_ok=True)
+    manifest_path = output / MANIFEST_NAME
+
+    existing: Dict[str, List[Dict]] = {}
+    if manifest_path.exists():
+        with open(manifest_path) as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    existing.setdefault(record["video"], []).append(record)
+
+    videos = find_videos(inputs)
+    todo = []
+    for video in videos:
+        records = existing.get(str(video.resolve()))
+        stat = video.stat()
+        if records and records[0]["video_size"] == stat.st_size and records[0]["video_mtime_ns"] == stat.st_mtime_ns:
+            continue
+        todo.append(video)
+    console.print(f"[green]{len(videos)} videos, {len(videos) - len(todo)} unchanged, extracting {len(todo)} with {workers} workers...[/green]")
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(extract_video, str(v), str(output), options): v for v in todo}
+        for future in as_completed(futures):
+            video = futures[future]
+            try:
+                records = future.result()
+            except Exception as e:
+                console.print(f"[bold red]Failed on {video}: {e}[/bold red]")
+                continue
+            if not records:
+                # Remembered as processed, so an unchanged video is not extracted again
+                stat = video.stat()
+                records = [{"path": None, "class": None, "video": str(video.resolve()),
+                            "video_size": stat.st_size, "video_mtime_ns": stat.st_mtime_ns}]
+            existing[str(video.resolve())] = records
+            console.print(f"  {video.name}: {sum(1 for r in records if r['path'])} frames")
+
+    tmp = manifest_path.with_suffix(".tmp")
+    with open(tmp, "w") as f:
+        for records in existing.values():
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+    os.replace(tmp, manifest_path)
+    total = sum(1 for records in existing.values() for record in records if record["path"])
+    console.print(f"[bold green]Done! {total} frames listed in {manifest_path}[/bold green]")
+
+
 if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser(description="Slice video into frames")
-    parser.add_argument("video", help="Path to video file")
+    parser.add_argument("video", nargs="+", help="Path to video file (smart mode: files and/or folders)")
     parser.add_argument("--output", "-o", default="dataset_raw/new_batch", help="Output directory")
     parser.add_argument("--interval", "-i", type=int, default=10, help="Save every Nth frame")
+    parser.add_argument("--smart", action="store_true", help="Content-based selection over many videos in parallel, with a manifest")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="Processes (smart mode)")
+    parser.add_argument("--stride", type=int, default=1, help="Only look at every Nth frame (smart mode)")
+    parser.add_argument("--scene-threshold", type=float, default=12.0, help="Mean gray difference that starts a new scene (smart mode)")
+    parser.add_argument("--min-sharpness", type=float, default=50.0, help="Minimum Laplacian variance (smart mode)")
+    parser.add_argument("--max-segment-s", type=float, default=10.0, help="Emit at least one frame per this many seconds of a static scene (smart mode)")
+    parser.add_argument("--roi", type=int, nargs=4, metavar=("X1", "Y1", "X2", "Y2"), help="Presence ROI: one frame per package crossing it (smart mode)")
+    parser.add_argument("--shots-per-package", type=int, default=3, help="Best-centred frames compared for sharpness per package (smart mode, --roi)")
+    parser.add_argument("--label", help="Class of all extracted frames, e.g. 'tear' (smart mode)")
+    parser.add_argument("--label-from-dir", action="store_true", help="Use each video's folder name as its class (smart mode)")
+    parser.add_argument("--quality", type=int, default=95, help="JPEG quality (smart mode)")
     
     args = parser.parse_args()
-    slice_video(args.video, args.output, args.interval)
+    if args.smart:
+        options = {
+            "stride": args.stride,
+            "scene_threshold": args.scene_threshold,
+            "min_sharpness": args.min_sharpness,
+            "max_segment_s": args.max_segment_s,
+            "roi": args.roi,
+            "shots_per_package": args.shots_per_package,
+            "label": args.label,
+            "label_from_dir": args.label_from_dir,
+            "quality": args.quality,
+        }
+        slice_videos_smart(args.video, args.output, options, args.workers)
+    else:
+        for video in args.video:
+            slice_video(video, args.output, args.interval)
@@ -0,0 +1,67 @@
+import threading
+
+import numpy as np
+
+from app.services.camera_station import CameraGrabber
+
+
+class FakeFileCapture:
+    """Stands in for cv2.VideoCapture on a video file with `frames` frames (0 = empty or corrupt)."""
+
+    def __init__(self, frames: int):
+        self.frames = frames
+        self.position = 0
+        self.reads = 0
+        self.rewinds = 0
+
+    def get(self, prop):
+        return 0.0
+
+    def set(self, prop, value):
+        self.rewinds += 1
+        self.position = int(value)
+        return True
+
+    def read(self):
+        self.reads += 1
+        if self.position >= self.frames:
+            return False, None
+        self.position += 1
+        return True, np.zeros((4, 4, 3), dtype=np.uint8)
+
+    def release(self):
+        pass
+
+
+def _grabber(cap: FakeFileCapture) -> CameraGrabber:
+    grabber = CameraGrabber("side", "side.mp4")
+    grabber.cap = cap
+    grabber.running = True
+    return grabber
+
+
+def test_empty_file_stops_grabber_with_backoff(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr("app.services.camera_station.time.sleep", sleeps.append)
+    cap = FakeFileCapture(frames=0)
+    grabber = _grabber(cap)
+
+    grabber._grab_loop()
+
+    assert not grabber.running
+    assert cap.reads == CameraGrabber.MAX_EMPTY_READS
+    assert sleeps == sorted(sleeps) and sleeps[0] > 0
+
+
+def test_file_source_keeps_looping():
+    cap = FakeFileCapture(frames=2)
+    grabber = _grabber(cap)
+    thread = threading.Thread(target=grabber._grab_loop, daemon=True)
+    thread.start()
+    try:
+        with grabber.condition:
+            grabber.condition.wait_for(lambda: cap.rewinds >= 3 * CameraGrabber.MAX_EMPTY_READS, timeout=5)
+        assert grabber.running
+    finally:
+        grabber.running = False
+        thread.join(timeout=5)
@@ -0,0 +1,24 @@
+from scripts.evaluate_model import sweep_thresholds
+
+
+def _record(label, predicted_class, confidence):
+    return {
+        "label": label,
+        "predicted_class": predicted_class,
+        "confidence": confidence,
+        "scores": {"ok": confidence if predicted_class == "ok" else 1.0 - confidence, "tear": 0.0},
+    }
+
+
+def test_no_recommendation_when_nothing_passes():
+    records = [_record("ok", "tear", 0.9), _record("ok", "tear", 0.7), _record("tear", "tear", 0.95)]
+    ok = sweep_thresholds(records, ["ok", "tear"], max_escape_rate=0.01)["ok"]
+    assert ok["recommended_ok_threshold"] is None
+    assert ok["ok_threshold_note"] == "no sample passes at any threshold"
+
+
+def test_recommends_lowest_cutoff_within_escape_rate():
+    records = [_record("ok", "ok", 0.9), _record("ok", "ok", 0.6), _record("tear", "ok", 0.5)]
+    ok = sweep_thresholds(records, ["ok", "tear"], max_escape_rate=0.0)["ok"]
+    assert ok["recommended_ok_threshold"] == 0.5
+    assert "ok_threshold_note" not in ok
@@ -0,0 +1,57 @@
+from app.core.config import settings
+from app.schemas.prediction import BoundingBox, PredictionResult
+from app.services.multishot import MultiShotAggregator, list_source
+
+
+def _shot(*confidences):
+    defects = [
+        BoundingBox(x1=0, y1=0, x2=10, y2=10, confidence=c, class_id=0, class_name="tear")
+        for c in confidences
+    ]
+    return PredictionResult(verdict="FAIL" if defects else "PASS", defects=defects, inference_time=0.01, model_name="fake")
+
+
+class ScriptedDetector:
+    """Returns the scripted shots in order and records the box confidence it was asked for."""
+
+    def __init__(self, shots):
+        self.shots = list(shots)
+        self.confs = []
+
+    def predict_batch(self, frames, conf):
+        self.confs.append(conf)
+        return [self.shots.pop(0) for _ in frames]
+
+
+def _run(shots):
+    detector = ScriptedDetector(shots)
+    aggregator = MultiShotAggregator(detector, max_shots=len(shots), batch_size=2, margin=0.1)
+    result = aggregator.run(list_source([None] * len(shots)), detector.predict_batch)
+    return result, detector
+
+
+def test_failing_shot_is_not_outvoted_by_clean_shots():
+    fail = settings.CONFIDENCE_THRESHOLD + 0.05
+    result, _ = _run([_shot(fail), _shot(), _shot()])
+    assert result.verdict == "FAIL"
+    assert [d.confidence for d in result.defects] == [fail]
+
+
+def test_near_miss_asks_for_more_shots():
+    near_miss = settings.CONFIDENCE_THRESHOLD - 0.05
+    result, detector = _run([_shot(near_miss), _shot(), _shot(settings.CONFIDENCE_THRESHOLD + 0.05)])
+    assert detector.confs[0] <= min(settings.CASCADE_BOX_BAND[0], settings.CONFIDENCE_THRESHOLD)
+    assert result.shots == 3
+    assert result.verdict == "FAIL"
+
+
+def test_near_miss_boxes_are_not_reported():
+    result, _ = _run([_shot(settings.CONFIDENCE_THRESHOLD - 0.05), _shot(), _shot()])
+    assert result.verdict == "PASS"
+    assert result.defects == []
+
+
+def test_clean_package_exits_after_one_shot():
+    result, _ = _run([_shot(), _shot(), _shot()])
+    assert result.verdict == "PASS"
+    assert result.shots == 1
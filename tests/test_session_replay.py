@@ -0,0 +1,71 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from app.schemas.prediction import PredictionResult
+from app.services import hardware_trigger
+from app.services.session_recorder import RecordedSession, SessionRecorder
+from app.services.session_replay import SessionReplayer
+
+
+class FakeInference:
+    """Fails every frame without loading a model."""
+
+    def warmup(self, shape):
+        pass
+
+    def predict_batch(self, frames, **kwargs):
+        return [
+            PredictionResult(verdict="FAIL", inference_time=0.0, model_name="fake", predicted_class="tear", confidence=0.9)
+            for _ in frames
+        ]
+
+
+@pytest.fixture
+def evidence_calls(monkeypatch):
+    calls = []
+
+    async def upload(data):
+        calls.append("upload")
+        return "s3://evidence.jpg"
+
+    async def send_inspection_result(result, image_url):
+        calls.append("notify")
+
+    monkeypatch.setattr(hardware_trigger, "get_inference_service", FakeInference)
+    monkeypatch.setattr(hardware_trigger.s3_client, "upload", upload)
+    monkeypatch.setattr(hardware_trigger.notifier_service, "send_inspection_result", send_inspection_result)
+    return calls
+
+
+def _station_views():
+    return [(name, 0.0, np.full((32, 32, 3), i * 50, dtype=np.uint8)) for i, name in enumerate(("top", "side"))]
+
+
+def test_live_station_publishes_evidence(evidence_calls):
+    async def run():
+        listener = hardware_trigger.TriggerListener()
+        result = await listener.process_views(_station_views())
+        await asyncio.sleep(0.1)  # evidence is uploaded in a background task
+        return result
+
+    assert asyncio.run(run()).verdict == "FAIL"
+    assert evidence_calls == ["upload", "upload", "notify"]
+
+
+def test_replayed_station_session_publishes_no_evidence(evidence_calls, tmp_path):
+    recorder = SessionRecorder(str(tmp_path))
+    for _ in range(2):
+        recorder.record(recorder.started, _station_views())
+    recorder.close()
+
+    async def run():
+        replayer = SessionReplayer(RecordedSession(str(tmp_path)), speed=0)
+        timelines = await replayer.run()
+        await asyncio.sleep(0.1)
+        return timelines
+
+    timelines = asyncio.run(run())
+    assert [t["verdict"] for t in timelines] == ["FAIL", "FAIL"]
+    assert evidence_calls == []